@@ -19,26 +19,61 @@ from redact import strip_harness_noise
 # failed — the failure survives only as text. Anchor on strong, specific
 # signals (never the bare word "error", never a "0 failed" summary) so a GREEN
 # run that merely mentions "error" or reports "0 failed" is not misclassified.
-_FAILURE_MARKER_PATTERNS = (
-    re.compile(r'\bFAIL'),                              # jest FAIL, go --- FAIL, pytest FAILED
-    re.compile(r'\bAssertionError\b'),                  # python/unittest
-    re.compile(r'\bTests?:\s*[1-9]\d*\s+failed', re.IGNORECASE),  # jest "Tests: 1 failed"
-    re.compile(r'\b[1-9]\d*\s+failed\b', re.IGNORECASE),          # "1 failed" (not "0 failed")
-    re.compile(r'(?im)^\s*exit code [1-9]'),            # explicit non-zero exit line
-    re.compile(r'(?m)^Error:'),                         # node/js error header (line-anchored)
-    re.compile(r'Traceback \(most recent call last\)'),  # python traceback
+_FAILURE_MARKERS = (
+    r'\bFAIL',                                  # jest FAIL, go --- FAIL, pytest FAILED
+    r'\bAssertionError\b',                      # python/unittest
+    r'(?i:\bTests?:\s*[1-9]\d*\s+failed)',       # jest "Tests: 1 failed"
+    r'(?i:\b[1-9]\d*\s+failed\b)',               # "1 failed" (not "0 failed")
+    r'(?im:^\s*exit code [1-9])',               # explicit non-zero exit line
+    r'(?m:^Error:)',                            # node/js error header (line-anchored)
+    r'Traceback \(most recent call last\)',     # python traceback
 )
+# One alternation (flags scoped per marker): a passing run — the common
+# case — is scanned once, not once per marker.
+_FAILURE_MARKER_RE = re.compile("|".join(_FAILURE_MARKERS))
+
+# How much of each stream the marker scan reads, from the end. Every marker
+# is a summary or a crash footer — jest/pytest/cargo totals, a traceback —
+# and those land in the last lines, so a multi-MB build log costs the same
+# to classify as a short one.
+_MARKER_SCAN = 16384
+
+# "exit code: N" trailer Claude Code appends to plain-string responses.
+_EXIT_CODE_RE = re.compile(r'exit\s*code[:\s]+(\d+)', re.IGNORECASE)
+
+
+# What callers read from the returned texts: handle_bash uses only the
+# first 200 chars of output; of error_text it reads a 2000-char head (the
+# signature) and a 400-char tail (the search query). Returning just those
+# spans lets a multi-MB build log be freed before the event is recorded.
+# Harness noise is stripped from the whole text first: a cut can split a
+# noise line into a fragment the noise check no longer recognises, and the
+# signature must hash the same noise-free head wherever the noise sat.
+_OUTPUT_KEEP = 200
+_ERROR_HEAD = 2000
+_ERROR_TAIL = 400
+
+
+def _bound_error(text: str) -> str:
+    """Head + tail of an error text, dropping the middle nobody reads."""
+    if len(text) <= _ERROR_HEAD + _ERROR_TAIL:
+        return text
+    return f"{text[:_ERROR_HEAD]}\n{text[-_ERROR_TAIL:]}"
 
 
 def _has_failure_marker(output: str, stderr: str) -> bool:
-    """True if combined output+stderr carries a precise failure marker.
+    """True if output or stderr carries a precise failure marker.
 
     Used only when the exit code is 0 or absent — the case a piped test run
     (`… | tail`) reports success it didn't earn. Strong markers only, so a
     passing run is never flagged just for containing the word "error".
+
+    Each stream is scanned separately and only its last _MARKER_SCAN chars:
+    concatenating them first copied the whole of a multi-MB build log just
+    to search it.
     """
-    combined = f"{output or ''}\n{stderr or ''}"
-    return any(p.search(combined) for p in _FAILURE_MARKER_PATTERNS)
+    return any(_FAILURE_MARKER_RE.search(t[-_MARKER_SCAN:])
+               for t in (output, stderr) if t)
 
 
 def detect_bash_error(data: dict) -> tuple[bool, str, str]:
@@ -46,7 +81,7 @@ def detect_bash_error(data: dict) -> tuple[bool, str, str]:
 
     Checks (in order):
     1. Non-zero exit code in tool_response (most reliable).
-    2. Exit code 0 or None: scan combined output+stderr for precise failure
+    2. Exit code 0 or None: scan output and stderr for precise failure
        markers (catches piped failures whose exit code is the pipe's last
        command). NON-empty stderr is NOT treated as failure on a clean exit —
        jest/pytest/cargo/go/npm/git all write NORMAL output to stderr on a
@@ -65,10 +100,17 @@ def detect_bash_error(data: dict) -> tuple[bool, str, str]:
     "noOutputExpected"} for Bash — no exit code, and stdout is NOT named
     "output". Both spellings are accepted so other harnesses still work.
 
-    Returns: (is_error, output_text, error_text_for_search)
+    Returns: (is_error, output_text, error_text_for_search) — output_text
+    truncated to its first 200 chars, error_text to the head and tail spans
+    callers read (see _bound_error).
     """
-    tool_response = data.get("tool_response", {})
+    is_error, output, error_text = _classify(data.get("tool_response", {}))
+    return (is_error, (output or "")[:_OUTPUT_KEEP],
+            _bound_error(strip_harness_noise(error_text)) if error_text else "")
+
 
+def _classify(tool_response) -> tuple[bool, str, str]:
+    """detect_bash_error's decision, on the full untruncated texts."""
     if isinstance(tool_response, dict):
         output = tool_response.get("stdout")
         if not output:
@@ -81,12 +123,12 @@ def detect_bash_error(data: dict) -> tuple[bool, str, str]:
         if exit_code is not None and exit_code != 0:
             # Use stderr if available, otherwise tail of output
             error_text = stderr if stderr else output[-500:]
-            return True, output, strip_harness_noise(error_text)
+            return True, output, error_text
 
         # 2. Exit code is 0 or None — scan for precise failure markers so a
         #    piped test run that "succeeded" via tail/head is still caught.
         if _has_failure_marker(output, stderr):
-            return True, output, strip_harness_noise((stderr or output)[-500:])
+            return True, output, (stderr or output)[-500:]
 
         # Explicit success (exit 0): trust it. Non-empty stderr on a clean
         # exit is normal tool chatter, NOT an error.
@@ -95,7 +137,7 @@ def detect_bash_error(data: dict) -> tuple[bool, str, str]:
 
         # 3. Exit code unknown (None) and no marker: Unix stderr convention.
         if stderr and stderr.strip():
-            return True, output, strip_harness_noise(stderr[-500:])
+            return True, output, stderr[-500:]
 
         return False, output, ""
 
@@ -106,15 +148,14 @@ def detect_bash_error(data: dict) -> tuple[bool, str, str]:
         # metadata appended by Claude Code, not error message parsing).
         output = tool_response
         # Claude Code appends "exit code: N" or similar
-        exit_match = re.search(r'exit\s*code[:\s]+(\d+)', output[-100:],
-                               re.IGNORECASE)
+        exit_match = _EXIT_CODE_RE.search(output[-100:])
         if exit_match and int(exit_match.group(1)) != 0:
-            return True, output, strip_harness_noise(output[-500:])
+            return True, output, output[-500:]
 
         # Piped failure captured as a plain string (exit code hidden) — the
         # marker scan still catches it without over-firing on a passing run.
         if _has_failure_marker(output, ""):
-            return True, output, strip_harness_noise(output[-500:])
+            return True, output, output[-500:]
 
         return False, output, ""
 
@@ -17,7 +17,7 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from session_state import read_events, read_context_fingerprint
+from session_state import EventCache, read_context_fingerprint
 from redact import redact_text, strip_harness_noise
 
 
@@ -133,13 +133,44 @@ def _build_title(top_pattern: str, evidence: dict, ctx_fp: dict | None) -> str:
     return title or "auto-contributed trace"
 
 
-def _build_journey_context(state_dir: Path) -> dict:
-    """Extract structured journey context from JSONL events for contribution templates."""
-    errors = read_events(state_dir, "errors.jsonl")
-    resolutions = read_events(state_dir, "resolutions.jsonl")
-    changes = read_events(state_dir, "changes.jsonl")
-    research = read_events(state_dir, "research.jsonl")
-    candidates = read_events(state_dir, "candidates.jsonl")
+def _summarize_changes(changes: list[dict]
+                       ) -> tuple[dict[str, int], list[str], int]:
+    """One pass over changes.jsonl: (edit count per file, config files,
+    most edits to any one file).
+
+    Both keep first-seen order, so the file counter doubles as the ordered
+    list of unique files the journey reports. Changes without a file are
+    not counted.
+    """
+    file_counts: dict[str, int] = {}
+    config_files: dict[str, None] = {}
+    max_edits = 0
+    for c in changes:
+        f = c.get("file", "")
+        if not f:
+            continue
+        n = file_counts[f] = file_counts.get(f, 0) + 1
+        if n > max_edits:
+            max_edits = n
+        if c.get("is_config"):
+            config_files[f] = None
+    return file_counts, list(config_files), max_edits
+
+
+def _build_journey_context(state_dir: Path,
+                           events: EventCache | None = None,
+                           change_summary: tuple | None = None) -> dict:
+    """Extract structured journey context from JSONL events for contribution templates.
+
+    change_summary is _summarize_changes() of changes.jsonl if the caller
+    already has it.
+    """
+    events = events or EventCache(state_dir)
+    errors = events.get("errors.jsonl")
+    resolutions = events.get("resolutions.jsonl")
+    changes = events.get("changes.jsonl")
+    research = events.get("research.jsonl")
+    candidates = events.get("candidates.jsonl")
 
     journey: dict = {}
 
@@ -170,13 +201,13 @@ def _build_journey_context(state_dir: Path) -> dict:
 
     # Unique file paths changed (up to 10)
     if changes:
-        files = list(dict.fromkeys(c.get("file", "") for c in changes if c.get("file")))
-        journey["files_changed"] = files[:10]
+        file_counts, config_files, _ = (change_summary
+                                        or _summarize_changes(changes))
+        journey["files_changed"] = list(file_counts)[:10]
 
         # Config files changed (up to 5)
-        config_files = [c.get("file", "") for c in changes if c.get("is_config")]
         if config_files:
-            journey["config_files"] = list(dict.fromkeys(config_files))[:5]
+            journey["config_files"] = config_files[:5]
 
     # Approaches tried — if reversal detected, capture original + final
     reversal_candidates = [c for c in candidates if c.get("pattern") == "approach_reversal"]
@@ -192,14 +223,16 @@ def _build_journey_context(state_dir: Path) -> dict:
 
 
 def _build_candidate(score: float, top_pattern: str, evidence: dict,
-                     state_dir: Path, transcript_path: str = "") -> dict:
+                     state_dir: Path, transcript_path: str = "",
+                     events: EventCache | None = None) -> dict:
     """Build a structured candidate payload + human prompt from detection state.
 
     Returns dict with: score, top_pattern, evidence, metadata_json,
     suggested_context_text, suggested_solution_text, suggested_tags,
     title, human_prompt.
     """
-    candidates = read_events(state_dir, "candidates.jsonl")
+    events = events or EventCache(state_dir)
+    candidates = events.get("candidates.jsonl")
 
     # Pattern-specific prompts
     prompts = {
@@ -248,18 +281,15 @@ def _build_candidate(score: float, top_pattern: str, evidence: dict,
             )
 
     # Build detection metadata for somatic intensity computation at API
-    errors = read_events(state_dir, "errors.jsonl")
-    changes = read_events(state_dir, "changes.jsonl")
-    all_events = errors + changes + read_events(state_dir, "research.jsonl")
+    errors = events.get("errors.jsonl")
+    changes = events.get("changes.jsonl")
+    all_events = errors + changes + events.get("research.jsonl")
     timestamps = [e.get("t", 0) for e in all_events if e.get("t")]
     duration_min = round(
         (max(timestamps) - min(timestamps)) / 60, 1) if timestamps else 0
 
-    file_counts = {}
-    for c in changes:
-        f = c.get("file", "")
-        file_counts[f] = file_counts.get(f, 0) + 1
-    max_iterations = max(file_counts.values()) if file_counts else 0
+    change_summary = _summarize_changes(changes)
+    max_iterations = change_summary[2]
 
     # Measured token cost of the resolution window (rides with the trace).
     # No LLM — a real sum of message.usage over the first-error->resolved span.
@@ -274,7 +304,7 @@ def _build_candidate(score: float, top_pattern: str, evidence: dict,
         tokens_to_resolution = (len(errors) + max_iterations) * TOKENS_PER_TURN_EST
 
     # Build journey context for pre-filled template
-    journey_ctx = _build_journey_context(state_dir)
+    journey_ctx = _build_journey_context(state_dir, events, change_summary)
     ctx_fp = read_context_fingerprint(state_dir)
 
     # Include error_message in metadata — earns +1 depth_score at API.
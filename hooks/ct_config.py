@@ -17,20 +17,39 @@ from pathlib import Path
 CONFIG_DIR = Path.home() / ".commontrace"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 COOLDOWN_DIR = CONFIG_DIR / "cooldowns"
+SEARCH_CACHE_DIR = CONFIG_DIR / "search_cache"
 
 API_BASE = "https://api.commontrace.org"
 
 
+# ((path, st_mtime_ns, st_size), parsed config) from the last read. Several
+# triggers in one hook run each want the API key; keying on the file's stat
+# means a write from another hook process (or a test) is still seen at once.
+_config_cache: tuple | None = None
+
+
 def read_config() -> dict:
-    """Read the config file. Returns {} on any failure — never raises."""
+    """Read the config file. Returns {} on any failure — never raises.
+
+    Returns a fresh copy each call; the parse is reused while the file is
+    unchanged on disk.
+    """
+    global _config_cache
+    try:
+        st = CONFIG_FILE.stat()
+    except OSError:
+        return {}
+    key = (str(CONFIG_FILE), st.st_mtime_ns, st.st_size)
+    if _config_cache is not None and _config_cache[0] == key:
+        return dict(_config_cache[1])
     try:
-        if CONFIG_FILE.exists():
-            data = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                return data
+        data = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
     except (json.JSONDecodeError, OSError):
-        pass
-    return {}
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    _config_cache = (key, data)
+    return dict(data)
 
 
 def write_config(config: dict) -> bool:
@@ -39,6 +58,8 @@ def write_config(config: dict) -> bool:
     The file holds the API key, so the directory is created 0700 and the
     file forced to 0600 on every write.
     """
+    global _config_cache
+    _config_cache = None
     try:
         CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
         CONFIG_FILE.write_text(json.dumps(config, indent=2), encoding="utf-8")
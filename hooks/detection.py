@@ -17,26 +17,31 @@ detected here. A signal that fires but never counts is worse than no signal
 at all — it looks like measurement while measuring nothing.
 """
 
+import re
 import sys
 import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 from bash_result import detect_bash_error
-from session_state import append_event, read_events
+from session_state import EventCache
 
 # Test commands for test_fix_cycle detection
 TEST_COMMANDS = {
     "pytest", "jest", "mocha", "vitest", "cargo test", "go test",
     "npm test", "yarn test", "rspec", "phpunit", "unittest",
-    "npm run test", "yarn run test",
+    "npm run test", "yarn run test", "pnpm test", "pnpm run test",
 }
+# The same commands as one alternation: a single scan per command instead
+# of one `in` test per entry (it runs over every recorded error, too).
+# Whole words only, with any run of whitespace between words — so
+# `cargo  test` counts and `jesting` or `go testdata` do not.
+_TEST_COMMAND_RE = re.compile(r"\b(?:%s)\b" % "|".join(
+    r"\s+".join(map(re.escape, c.split())) for c in sorted(TEST_COMMANDS)))
 
 # Documentation extensions — edits to these are prose, not a code correction.
 _DOCS_EXTENSIONS = {".md", ".markdown", ".mdx", ".rst"}
 
-_CODE_TOOLS = ("Write", "Edit", "NotebookEdit")
-
 
 def _is_docs_only(file_path: str) -> bool:
     """True for documentation/markdown files.
@@ -48,15 +53,32 @@ def _is_docs_only(file_path: str) -> bool:
     return Path(file_path).suffix.lower() in _DOCS_EXTENSIONS
 
 
-def _has_candidate(state_dir: Path, pattern: str,
+def _candidate_keys(candidates: list[dict]) -> set[tuple[str, str]]:
+    """Index recorded candidates by (pattern, "") and (pattern, file)."""
+    seen = set()
+    for c in candidates:
+        _index_candidate(seen, c)
+    return seen
+
+
+def _index_candidate(seen: set[tuple[str, str]], c: dict) -> None:
+    pattern = c.get("pattern")
+    seen.add((pattern, ""))
+    if c.get("file"):
+        seen.add((pattern, c["file"]))
+
+
+def _has_candidate(seen: set[tuple[str, str]], pattern: str,
                    extra_key: str = "") -> bool:
     """Check if a knowledge candidate of this type already exists."""
-    for c in read_events(state_dir, "candidates.jsonl"):
-        if c.get("pattern") == pattern:
-            if extra_key and c.get("file") != extra_key:
-                continue
-            return True
-    return False
+    return (pattern, extra_key) in seen
+
+
+def _add_candidate(events: EventCache, seen: set[tuple[str, str]],
+                   entry: dict) -> None:
+    """Record a candidate; later detectors in this pass see it in `seen`."""
+    events.append("candidates.jsonl", entry)
+    _index_candidate(seen, entry)
 
 
 def _tool_file_path(data: dict) -> str:
@@ -69,19 +91,23 @@ def _tool_command(data: dict) -> str:
     return ti.get("command", "") if isinstance(ti, dict) else ""
 
 
-def _detect_research_then_implement(data: dict, state_dir: Path,
-                                    now: float) -> None:
+def _detect_research_then_implement(data: dict, events: EventCache,
+                                    seen: set, now: float) -> None:
     """Research events, then code, with no errors along the way."""
-    research = read_events(state_dir, "research.jsonl")
-    if not research or read_events(state_dir, "errors.jsonl"):
+    # Events are appended in time order, so the tail alone answers both
+    # "any research?" and "was it recent?" without parsing the whole log.
+    last_research = events.last("research.jsonl")
+    # Once recorded, this pattern never fires again: skip errors.jsonl.
+    if not last_research or _has_candidate(seen, "research_then_implement"):
         return
     # Only fire if research was recent (within the last 10 minutes)
-    if now - max(r.get("t", 0) for r in research) >= 600:
+    if now - last_research.get("t", 0) >= 600:
         return
-    if _has_candidate(state_dir, "research_then_implement"):
+    if events.has("errors.jsonl"):
         return
-    changes = read_events(state_dir, "changes.jsonl")
-    append_event(state_dir, "candidates.jsonl", {
+    research = events.get("research.jsonl")
+    changes = events.get("changes.jsonl")
+    _add_candidate(events, seen, {
         "pattern": "research_then_implement",
         "research_queries": [r.get("query", "")[:100] for r in research[-3:]],
         "file": _tool_file_path(data),
@@ -90,37 +116,42 @@ def _detect_research_then_implement(data: dict, state_dir: Path,
     })
 
 
-def _detect_approach_reversal(data: dict, state_dir: Path) -> None:
+def _detect_approach_reversal(data: dict, events: EventCache, seen: set,
+                              now: float) -> None:
     """A Write over a file that was Edit-ed 3+ times: the model was wrong."""
     file_path = _tool_file_path(data)
-    if not file_path:
+    if not file_path or _has_candidate(seen, "approach_reversal", file_path):
         return
     edit_count = sum(
-        1 for c in read_events(state_dir, "changes.jsonl")
+        1 for c in events.get("changes.jsonl")
         if c.get("file") == file_path and c.get("tool") == "Edit"
     )
-    if edit_count < 3 or _has_candidate(state_dir, "approach_reversal",
-                                        file_path):
+    if edit_count < 3:
         return
-    append_event(state_dir, "candidates.jsonl", {
+    _add_candidate(events, seen, {
         "pattern": "approach_reversal",
         "file": file_path,
         "previous_edits": edit_count,
     })
 
 
-def _detect_post_turn_revision(data: dict, state_dir: Path, now: float) -> None:
+def _detect_post_turn_revision(data: dict, events: EventCache, seen: set,
+                               now: float) -> None:
     """Same file touched before AND after a user turn: the user redirected."""
     file_path = _tool_file_path(data)
     # Skip docs-only (*.md) edits — re-touching a markdown file across a
     # user turn is note-writing, not a redirected approach.
     if not file_path or _is_docs_only(file_path):
         return
-    user_turns = read_events(state_dir, "user_turns.jsonl")
-    changes = read_events(state_dir, "changes.jsonl")
-    if not user_turns or len(changes) < 2:
+    if _has_candidate(seen, "post_turn_revision", file_path):
+        return
+    last_turn = events.last("user_turns.jsonl")
+    if not last_turn:
+        return
+    changes = events.get("changes.jsonl")
+    if len(changes) < 2:
         return
-    last_turn_t = max(u.get("t", 0) for u in user_turns)
+    last_turn_t = last_turn.get("t", 0)
     pre_turn_edits = [
         c for c in changes
         if c.get("file") == file_path and c.get("t", 0) < last_turn_t
@@ -128,55 +159,75 @@ def _detect_post_turn_revision(data: dict, state_dir: Path, now: float) -> None:
     # The current edit is AFTER the user turn (we are in post_tool_use).
     if not pre_turn_edits or now <= last_turn_t:
         return
-    if _has_candidate(state_dir, "post_turn_revision", file_path):
-        return
-    append_event(state_dir, "candidates.jsonl", {
+    _add_candidate(events, seen, {
         "pattern": "post_turn_revision",
         "file": file_path,
         "pre_turn_edits": len(pre_turn_edits),
     })
 
 
-def _detect_test_fix_cycle(data: dict, state_dir: Path) -> None:
-    """Tests failed, non-test code changed, tests now pass."""
-    command = _tool_command(data)
-    is_error, _output, _error_text = detect_bash_error(data)
-    if is_error or not any(tc in command for tc in TEST_COMMANDS):
+def _detect_test_fix_cycle(data: dict, events: EventCache, seen: set,
+                           now: float) -> None:
+    """Tests failed, non-test code changed, tests now pass.
+
+    Runs only for a successful Bash (see _detect_knowledge_candidates).
+    """
+    if not _TEST_COMMAND_RE.search(_tool_command(data)):
+        return
+    if _has_candidate(seen, "test_fix_cycle"):
         return
     test_failures = [
-        e for e in read_events(state_dir, "errors.jsonl")
-        if any(tc in e.get("command", "") for tc in TEST_COMMANDS)
+        e for e in events.get("errors.jsonl")
+        if _TEST_COMMAND_RE.search(e.get("command", ""))
     ]
     non_test_changes = [
-        c for c in read_events(state_dir, "changes.jsonl")
+        c for c in events.get("changes.jsonl")
         if "test" not in c.get("file", "").lower()
         and "spec" not in c.get("file", "").lower()
     ]
     if not test_failures or not non_test_changes:
         return
-    if _has_candidate(state_dir, "test_fix_cycle"):
-        return
-    append_event(state_dir, "candidates.jsonl", {
+    _add_candidate(events, seen, {
         "pattern": "test_fix_cycle",
         "test_failures": len(test_failures),
         "fix_files": [c.get("file") for c in non_test_changes[:5]],
     })
 
 
+# Which detectors can fire for each tool; every other tool runs none.
+_CODE_DETECTORS = (_detect_research_then_implement, _detect_post_turn_revision)
+_DETECTORS = {
+    "Write": _CODE_DETECTORS + (_detect_approach_reversal,),
+    "Edit": _CODE_DETECTORS,
+    "NotebookEdit": _CODE_DETECTORS,
+    "Bash": (_detect_test_fix_cycle,),
+}
+
+
 def _detect_knowledge_candidates(tool_name: str, data: dict,
-                                 state_dir: Path) -> None:
+                                 state_dir: Path,
+                                 bash_result: tuple | None = None) -> None:
     """Detect knowledge crystallization moments from tool-use sequences.
 
     Writes candidates to candidates.jsonl when a state transition occurs.
     Each candidate captures the pattern type and surrounding context so
     the stop hook can score importance and pre-assemble contribution drafts.
+
+    The detectors share one EventCache, so each JSONL file is parsed at most
+    once per call however many of them read it. candidates.jsonl is indexed
+    once into `seen`, and each detector checks it before the growing
+    change/error logs, so a pattern already recorded costs no history scan.
+
+    bash_result is detect_bash_error(data) if the caller already has it.
     """
+    detectors = _DETECTORS.get(tool_name)
+    if not detectors:
+        return
+    # A failing command completes no pattern; only a success can.
+    if tool_name == "Bash" and (bash_result or detect_bash_error(data))[0]:
+        return
     now = time.time()
-
-    if tool_name in _CODE_TOOLS:
-        _detect_research_then_implement(data, state_dir, now)
-        _detect_post_turn_revision(data, state_dir, now)
-    if tool_name == "Write":
-        _detect_approach_reversal(data, state_dir)
-    if tool_name == "Bash":
-        _detect_test_fix_cycle(data, state_dir)
+    events = EventCache(state_dir)
+    seen = _candidate_keys(events.get("candidates.jsonl"))
+    for detect in detectors:
+        detect(data, events, seen, now)
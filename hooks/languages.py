@@ -0,0 +1,16 @@
+"""Source-file extensions and the language each one means.
+
+session_start counts these to find a project's primary language, and
+retrieval reads them to tell when an edit enters a different one. Both used
+to carry their own copy of the table; a language added to one and not the
+other would detect a project the triggers then never recognise.
+"""
+
+EXTENSION_TO_LANGUAGE = {
+    ".py": "python", ".ts": "typescript", ".tsx": "typescript",
+    ".jsx": "javascript", ".js": "javascript", ".go": "go",
+    ".rs": "rust", ".java": "java", ".rb": "ruby",
+}
+
+# Extensions that count as source when scanning a tree.
+SOURCE_EXTENSIONS = frozenset(EXTENSION_TO_LANGUAGE)
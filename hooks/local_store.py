@@ -1,6 +1,6 @@
 """Persistent local store for cross-session working memory.
 
-SQLite database at ~/.commontrace/local.db (6-table working memory cache).
+SQLite database at ~/.commontrace/local.db (7-table working memory cache).
 The remote PostgreSQL API is the source of truth. This store tracks only:
   - projects: identity and language/framework metadata
   - sessions: per-session stats and top pattern
@@ -8,21 +8,40 @@ The remote PostgreSQL API is the source of truth. This store tracks only:
   - trigger_feedback: which triggers led to trace consumption
   - error_signatures: error fingerprints + the fix that resolved them (recurrence detection and error-time injection)
   - savings_events: permanent ledger of minutes/tokens the commons saved (v4)
+  - prompt_dedup: which once-per-session Stop prompts already fired
 
-All functions accept an open connection (callers call _get_conn()).
-All write operations call conn.commit() immediately.
+All functions accept an open connection (callers call get_conn(), which
+caches one connection per thread for the life of the process).
+All write operations commit immediately, unless the caller groups them
+inside batch(conn) — then the batch commits once at the end.
 All operations are wrapped in try/except by callers — fall back to JSONL.
 """
 
+import atexit
 import json
+import re
 import sqlite3
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path.home() / ".commontrace" / "local.db"
 
 CURRENT_SCHEMA_VERSION = 4
 
+# Database paths whose migrations + _SCHEMA already ran in this process.
+# Keyed by path (not a bare flag) so a patched DB_PATH gets its own setup.
+_SCHEMA_APPLIED: set[str] = set()
+
+# id()s of connections currently inside batch() — their writers defer the
+# commit to the batch instead of paying one WAL sync each.
+_BATCHED: set[int] = set()
+
+# Per-thread cached connection for get_conn(). sqlite3 connections refuse
+# cross-thread use by default, so each thread owns its own.
+_local = threading.local()
+
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS projects (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -70,6 +89,12 @@ CREATE TABLE IF NOT EXISTS trigger_feedback (
     consumed_at REAL
 );
 CREATE INDEX IF NOT EXISTS idx_trigger_feedback_session ON trigger_feedback(session_id);
+-- record_trace_consumed: newest still-unconsumed trigger of a session. The
+-- partial index holds only open rows, so the lookup is one seek that stops
+-- at the first entry instead of a walk over the session's whole history.
+CREATE INDEX IF NOT EXISTS idx_trigger_feedback_unconsumed
+    ON trigger_feedback(session_id, triggered_at DESC)
+    WHERE trace_consumed_id IS NULL;
 
 CREATE TABLE IF NOT EXISTS error_signatures (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -85,6 +110,11 @@ CREATE TABLE IF NOT EXISTS error_signatures (
     UNIQUE(project_id, signature)
 );
 CREATE INDEX IF NOT EXISTS idx_error_sig_project ON error_signatures(project_id, created_at DESC);
+-- Savings booking + session counters: resolved signatures of a project
+-- since a time floor. Unresolved rows (the majority) never enter the index.
+CREATE INDEX IF NOT EXISTS idx_error_sig_resolved
+    ON error_signatures(project_id, resolved_at)
+    WHERE resolved_at IS NOT NULL;
 
 CREATE TABLE IF NOT EXISTS savings_events (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -100,8 +130,18 @@ CREATE TABLE IF NOT EXISTS savings_events (
     UNIQUE(session_id, event_type, signature)
 );
 CREATE INDEX IF NOT EXISTS idx_savings_created ON savings_events(project_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS prompt_dedup (
+    session_key TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY(session_key, dedup_key)
+) WITHOUT ROWID;
 """
 
+# Every table/index _SCHEMA creates — the warm-open presence check.
+_SCHEMA_OBJECTS = tuple(re.findall(r"IF NOT EXISTS (\w+)", _SCHEMA))
+
 
 def _apply_migrations(conn: sqlite3.Connection) -> None:
     """Apply schema migrations based on PRAGMA user_version."""
@@ -256,42 +296,143 @@ def _migrate_to_v4(conn: sqlite3.Connection) -> None:
     """)
 
 
+def _schema_is_current(conn: sqlite3.Connection) -> bool:
+    """True when user_version is current and every _SCHEMA object exists.
+
+    One sqlite_master lookup instead of reparsing the whole script: a warm
+    database (every hook after the first) skips the DDL entirely, while a
+    newly added table or index still sends it down the setup path.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] < CURRENT_SCHEMA_VERSION:
+        return False
+    marks = ",".join("?" * len(_SCHEMA_OBJECTS))
+    present = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({marks})",
+        _SCHEMA_OBJECTS,
+    ).fetchone()[0]
+    return present == len(_SCHEMA_OBJECTS)
+
+
 def _get_conn() -> sqlite3.Connection:
     """Open the local SQLite database with WAL mode and migration gate.
 
     Backs up the database before any migration. Creates the schema (CREATE IF
-    NOT EXISTS) on every connection — safe because all DDL is idempotent.
+    NOT EXISTS) only when the file is missing objects — at most once per path
+    per process, and atomically under BEGIN IMMEDIATE.
     """
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    key = str(DB_PATH)
+    existed = DB_PATH.exists()
+    # A deleted database file needs its schema again even if we set it up.
+    needs_schema = key not in _SCHEMA_APPLIED or not existed
+
+    conn = sqlite3.connect(key, timeout=5)
+    try:
+        # Check version and backup if migration is needed — on this same
+        # connection, before the journal-mode switch touches the file.
+        if needs_schema and existed:
+            current_ver = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current_ver < CURRENT_SCHEMA_VERSION:
+                import shutil
+                try:
+                    shutil.copy2(key, key + ".bak")
+                except OSError:
+                    pass
+
+        # Set WAL mode FIRST — before any DDL (Pitfall 7). WAL persists in
+        # the file, so this is a one-time transition per database; an
+        # in-memory database can't use it and keeps its default journal.
+        if key != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        # One fsync per checkpoint instead of two per commit — every hook
+        # commits, so journal syncs dominate hook wall-clock otherwise.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.row_factory = sqlite3.Row
+        if needs_schema:
+            if not _schema_is_current(conn):
+                _apply_migrations(conn)
+                # CREATE IF NOT EXISTS for all 7 tables, as one transaction
+                # so a concurrent hook never sees a half-built schema.
+                conn.executescript("BEGIN IMMEDIATE;" + _SCHEMA + "COMMIT;")
+            _SCHEMA_APPLIED.add(key)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def get_conn() -> sqlite3.Connection:
+    """Return this thread's cached connection, opening it on first use.
+
+    Reopens when DB_PATH has changed since the cached connection was made.
+    The connection is shared — callers must not close it; close_conn() runs
+    at interpreter exit.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == str(DB_PATH):
+        return conn
+    close_conn()
+    conn = _get_conn()
+    _local.conn, _local.path = conn, str(DB_PATH)
+    return conn
 
-    # Check version and backup if migration is needed
-    current_ver = 0
-    if DB_PATH.exists():
+
+def close_conn() -> None:
+    """Close this thread's cached connection, if any.
+
+    Runs PRAGMA optimize first so sqlite_stat1 stays fresh enough for the
+    planner to keep choosing the partial indexes as tables grow. It only
+    analyzes tables whose stats look stale, and analysis_limit caps the
+    rows sampled, so this is usually a no-op.
+    """
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
         try:
-            tmp = sqlite3.connect(str(DB_PATH))
-            try:
-                current_ver = tmp.execute("PRAGMA user_version").fetchone()[0]
-            finally:
-                tmp.close()
-        except Exception:
+            conn.execute("PRAGMA analysis_limit=1000")
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
             pass
-        if current_ver < CURRENT_SCHEMA_VERSION:
-            import shutil
-            try:
-                shutil.copy2(str(DB_PATH), str(DB_PATH) + ".bak")
-            except OSError:
-                pass
-
-    conn = sqlite3.connect(str(DB_PATH), timeout=5)
-    # Set WAL mode FIRST — before any DDL (Pitfall 7)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA synchronous=NORMAL")
-    conn.execute("PRAGMA cache_size=-8000")
-    conn.execute("PRAGMA temp_store=MEMORY")
-    conn.row_factory = sqlite3.Row
-    _apply_migrations(conn)
-    conn.executescript(_SCHEMA)  # CREATE IF NOT EXISTS for all 6 tables
-    return conn
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_conn)
+
+
+@contextmanager
+def batch(conn: sqlite3.Connection):
+    """Group several writes into one transaction (one commit, one WAL sync).
+
+    Writers called inside the block skip their own commit. Commits on a
+    clean exit, rolls back on an exception. Nested batches join the outer.
+    """
+    if id(conn) in _BATCHED:
+        yield conn
+        return
+    if conn.in_transaction:
+        conn.commit()  # flush a caller's pending writes, as a writer would
+    conn.execute("BEGIN IMMEDIATE")
+    _BATCHED.add(id(conn))
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _BATCHED.discard(id(conn))
+
+
+def _commit(conn: sqlite3.Connection) -> None:
+    """Commit now, unless an enclosing batch() will commit for us."""
+    if id(conn) not in _BATCHED:
+        conn.commit()
 
 
 # ---------------------------------------------------------------------------
@@ -300,20 +441,21 @@ def _get_conn() -> sqlite3.Connection:
 
 def ensure_project(conn: sqlite3.Connection, cwd: str,
                    language: str = None, framework: str = None) -> int:
-    """Upsert project record and return project_id."""
+    """Upsert project record and return project_id (one statement)."""
     now = time.time()
-    conn.execute(
+    row = conn.execute(
         "INSERT INTO projects (path, language, framework, first_seen_at, last_seen_at, session_count) "
         "VALUES (?, ?, ?, ?, ?, 1) "
         "ON CONFLICT(path) DO UPDATE SET "
         "language = COALESCE(excluded.language, language), "
         "framework = COALESCE(excluded.framework, framework), "
         "last_seen_at = excluded.last_seen_at, "
-        "session_count = session_count + 1",
+        "session_count = session_count + 1 "
+        "RETURNING id",
         (cwd, language, framework, now, now),
-    )
-    conn.commit()
-    row = conn.execute("SELECT id FROM projects WHERE path = ?", (cwd,)).fetchone()
+    ).fetchone()
+    # Fetch RETURNING before commit — the statement must finish first.
+    _commit(conn)
     return row["id"]
 
 
@@ -323,7 +465,7 @@ def start_session(conn: sqlite3.Connection, session_id: str, project_id: int) ->
         "INSERT OR IGNORE INTO sessions (id, project_id, started_at) VALUES (?, ?, ?)",
         (session_id, project_id, time.time()),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def end_session(conn: sqlite3.Connection, session_id: str, stats: dict,
@@ -343,7 +485,7 @@ def end_session(conn: sqlite3.Connection, session_id: str, stats: dict,
             session_id,
         ),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def get_project_context(conn: sqlite3.Connection, cwd: str) -> dict | None:
@@ -352,18 +494,10 @@ def get_project_context(conn: sqlite3.Connection, cwd: str) -> dict | None:
     Reads only from the projects table (no entities join).
     Returns: {project_id, session_count, language?, framework?}
     """
-    row = conn.execute(
+    return _project_ctx(conn.execute(
         "SELECT id, language, framework, session_count FROM projects WHERE path = ?",
         (cwd,),
-    ).fetchone()
-    if not row:
-        return None
-    ctx = {"project_id": row["id"], "session_count": row["session_count"]}
-    if row["language"]:
-        ctx["language"] = row["language"]
-    if row["framework"]:
-        ctx["framework"] = row["framework"]
-    return ctx
+    ).fetchone())
 
 
 def get_project_context_by_id(conn: sqlite3.Connection,
@@ -375,10 +509,14 @@ def get_project_context_by_id(conn: sqlite3.Connection,
     re-resolve by a path that may be a subdirectory of the project root —
     the projects table is keyed on the session cwd exactly.
     """
-    row = conn.execute(
+    return _project_ctx(conn.execute(
         "SELECT id, language, framework, session_count FROM projects WHERE id = ?",
         (project_id,),
-    ).fetchone()
+    ).fetchone())
+
+
+def _project_ctx(row: sqlite3.Row | None) -> dict | None:
+    """Shape a projects row into the context dict (None passes through)."""
     if not row:
         return None
     ctx = {"project_id": row["id"], "session_count": row["session_count"]}
@@ -417,7 +555,7 @@ def record_error_signature(conn: sqlite3.Connection, project_id: int,
             "VALUES (?, ?, ?, ?, 1)",
             (project_id, signature, now, now),
         )
-        conn.commit()
+        _commit(conn)
         return {"recurrence": False, "seen_count": 1, "resolved": False,
                 "fix_command": None, "fix_files": [], "trace_id": None,
                 "last_seen_at": now}
@@ -426,7 +564,7 @@ def record_error_signature(conn: sqlite3.Connection, project_id: int,
         "last_seen_at = ? WHERE project_id = ? AND signature = ?",
         (now, project_id, signature),
     )
-    conn.commit()
+    _commit(conn)
     fix_files = []
     if row["fix_files"]:
         try:
@@ -463,7 +601,7 @@ def record_resolution(conn: sqlite3.Connection, project_id: int,
          json.dumps(fix_files) if fix_files else None,
          trace_id, project_id, signature),
     )
-    conn.commit()
+    _commit(conn)
     return cur.rowcount > 0
 
 
@@ -532,6 +670,30 @@ def prev_session_started_at(conn: sqlite3.Connection,
     return row[0] if row and row[0] is not None else None
 
 
+# ---------------------------------------------------------------------------
+# Prompt dedup
+# ---------------------------------------------------------------------------
+
+def was_prompted(conn: sqlite3.Connection, session_key: str,
+                 dedup_key: str) -> bool:
+    """True if the (session, dedup_key) prompt already fired."""
+    return conn.execute(
+        "SELECT 1 FROM prompt_dedup WHERE session_key = ? AND dedup_key = ?",
+        (session_key, dedup_key),
+    ).fetchone() is not None
+
+
+def record_prompted(conn: sqlite3.Connection, session_key: str,
+                    dedup_key: str) -> None:
+    """Record that the (session, dedup_key) prompt fired. Idempotent."""
+    conn.execute(
+        "INSERT OR IGNORE INTO prompt_dedup (session_key, dedup_key, created_at) "
+        "VALUES (?, ?, ?)",
+        (session_key, dedup_key, time.time()),
+    )
+    _commit(conn)
+
+
 # ---------------------------------------------------------------------------
 # Trigger feedback
 # ---------------------------------------------------------------------------
@@ -544,24 +706,24 @@ def record_trigger(conn: sqlite3.Connection, session_id: str,
         "VALUES (?, ?, ?)",
         (session_id, trigger_name, time.time()),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def record_trace_consumed(conn: sqlite3.Connection, session_id: str,
                           trace_id: str) -> None:
-    """Mark that a trace was consumed after a trigger fired this session."""
-    row = conn.execute(
-        "SELECT id FROM trigger_feedback "
+    """Mark that a trace was consumed after a trigger fired this session.
+
+    One statement: the sub-select seeks idx_trigger_feedback_unconsumed and
+    stops at the newest open trigger. No open trigger updates nothing.
+    """
+    conn.execute(
+        "UPDATE trigger_feedback SET trace_consumed_id = ?, consumed_at = ? "
+        "WHERE id = (SELECT id FROM trigger_feedback "
         "WHERE session_id = ? AND trace_consumed_id IS NULL "
-        "ORDER BY triggered_at DESC LIMIT 1",
-        (session_id,),
-    ).fetchone()
-    if row:
-        conn.execute(
-            "UPDATE trigger_feedback SET trace_consumed_id = ?, consumed_at = ? WHERE id = ?",
-            (trace_id, time.time(), row["id"]),
-        )
-        conn.commit()
+        "ORDER BY triggered_at DESC LIMIT 1)",
+        (trace_id, time.time(), session_id),
+    )
+    _commit(conn)
 
 
 def get_trigger_effectiveness(conn: sqlite3.Connection,
@@ -608,7 +770,7 @@ def cache_trace_pointer(conn: sqlite3.Connection, trace_id: str,
         "last_seen_at = excluded.last_seen_at, title = excluded.title",
         (trace_id, project_id, title[:120], source, now, now),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def mark_trace_used_v2(conn: sqlite3.Connection, trace_id: str,
@@ -619,7 +781,7 @@ def mark_trace_used_v2(conn: sqlite3.Connection, trace_id: str,
         "WHERE trace_id = ? AND project_id = ?",
         (time.time(), trace_id, project_id),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def record_trace_vote_v2(conn: sqlite3.Connection, trace_id: str,
@@ -629,7 +791,7 @@ def record_trace_vote_v2(conn: sqlite3.Connection, trace_id: str,
         "UPDATE trace_cache SET vote = ? WHERE trace_id = ?",
         (vote_type, trace_id),
     )
-    conn.commit()
+    _commit(conn)
 
 
 def get_cached_traces(conn: sqlite3.Connection, project_id: int,
@@ -658,6 +820,7 @@ def prune_stale_cache(conn: sqlite3.Connection) -> None:
     - trigger_feedback: 60 days
     - error_signatures: 90 days unresolved, 180 days resolved (a stored fix is the product — keep it longer)
     - savings_events: NEVER pruned — permanent ledger (lifetime savings must not erode)
+    - prompt_dedup: 90 days (a session that old never stops again)
     """
     now = time.time()
     conn.execute(
@@ -686,5 +849,12 @@ def prune_stale_cache(conn: sqlite3.Connection) -> None:
         "WHERE resolved_at IS NOT NULL AND last_seen_at < ?",
         (now - 180 * 86400,),
     )
-    conn.commit()
-    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    conn.execute(
+        "DELETE FROM prompt_dedup WHERE created_at < ?",
+        (now - 90 * 86400,),
+    )
+    _commit(conn)
+    if id(conn) not in _BATCHED:
+        # Checkpointing needs no open transaction; a batched prune leaves
+        # it to the next autocommit prune.
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
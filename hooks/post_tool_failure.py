@@ -23,14 +23,12 @@ except Exception:
     pass
 
 sys.path.insert(0, str(Path(__file__).parent))
-from session_state import get_state_dir, append_event
-from redact import redact_command, redact_text, strip_harness_noise
 
 
 def main() -> None:
     try:
         raw = sys.stdin.read()
-        data = json.loads(raw) if raw.strip() else {}
+        data = json.loads(raw) if raw and not raw.isspace() else {}
     except (json.JSONDecodeError, OSError):
         return
 
@@ -39,6 +37,11 @@ def main() -> None:
     if not tool_name or not error:
         return
 
+    # Imported only past the early returns — empty failure events (common)
+    # exit without loading session_state or compiling the redact patterns.
+    from session_state import get_state_dir, append_event
+    from redact import redact_command, redact_text, strip_harness_noise
+
     state_dir = get_state_dir(data)
 
     tool_input = data.get("tool_input", {})
@@ -16,7 +16,6 @@ contributions) as they go; stop.py scores them at the end of the session.
 """
 
 import json
-import re
 import sys
 from pathlib import Path
 
@@ -46,23 +45,49 @@ try:
         format_error_hits, search_on_bash_error,
     )
     from session_state import (
-        append_event, error_signature, get_state_dir, is_config_file, log_hook_error,
+        error_signature, flush_events, get_state_dir, has_events,
+        is_config_file, log_hook_error, queue_event, read_counter,
         read_events, read_project_id,
     )
 except ImportError:
     sys.exit(0)
 
+_HEX_DIGITS = "0123456789abcdef"
+_UUID_SCAN_LIMIT = 4096
+
+
+def _find_uuid(text: str) -> str:
+    """First lowercase 8-4-4-4-12 UUID in text, or "".
+
+    The shape is fixed, so no regex: every '-' is a candidate first dash,
+    and the 36-char window around it is checked at the fixed dash offsets.
+    Same leftmost match as the equivalent pattern, at str.find speed.
+    """
+    d = text.find("-", 8)
+    while d != -1:
+        w = text[d - 8:d + 28]
+        if (len(w) == 36 and w[13] == w[18] == w[23] == "-"
+                and not (w[:8] + w[9:13] + w[14:18] + w[19:23]
+                         + w[24:]).strip(_HEX_DIGITS)):
+            return w
+        d = text.find("-", d + 1)
+    return ""
+
 
 # ── Tool handlers ────────────────────────────────────────────────────────
 
-def handle_bash(data: dict, state_dir: Path) -> dict | None:
-    """Handle Bash tool: record errors/resolutions, search on errors."""
+def handle_bash(data: dict, state_dir: Path,
+                bash_result: tuple[bool, str, str] | None = None) -> dict | None:
+    """Handle Bash tool: record errors/resolutions, search on errors.
+
+    bash_result is detect_bash_error(data) when main() already computed it.
+    """
     tool_input = data.get("tool_input", {})
     command = ""
     if isinstance(tool_input, dict):
         command = tool_input.get("command", "")
 
-    is_error, output, error_text = detect_bash_error(data)
+    is_error, output, error_text = bash_result or detect_bash_error(data)
 
     if not output and not error_text:
         return None
@@ -71,10 +96,13 @@ def handle_bash(data: dict, state_dir: Path) -> dict | None:
         # M19/M20: Redact secrets before storing or sending
         safe_command = redact_command(command[:200])
         safe_error = redact_text(error_text[:500])
-        # M19: signature computed from REDACTED text — it is stored in local.db
-        sig = error_signature(redact_text(error_text))
+        # M19: signature computed from REDACTED text — it is stored in local.db.
+        # error_signature keeps only the first 500 chars; redacting a 2000-char
+        # head (not the whole, possibly multi-MB, stderr) leaves slack for
+        # replacements to shrink the text without exposing unredacted bytes.
+        sig = error_signature(redact_text(error_text[:2000]))
 
-        append_event(state_dir, "errors.jsonl", {
+        queue_event(state_dir, "errors.jsonl", {
             "source": "bash",
             "command": safe_command,
             "output_tail": safe_error,
@@ -96,9 +124,13 @@ def handle_bash(data: dict, state_dir: Path) -> dict | None:
         return None
 
     # ── Success: check if this resolves a previous error ──
+    # Most successful commands come before any error: a stat answers that
+    # without opening or parsing errors.jsonl.
+    if not has_events(state_dir, "errors.jsonl"):
+        return None
     previous_errors = read_events(state_dir, "errors.jsonl")
     if previous_errors:
-        append_event(state_dir, "resolutions.jsonl", {
+        queue_event(state_dir, "resolutions.jsonl", {
             "source": "bash",
             "command": redact_command(command[:200]),
             "output_preview": redact_text(output[:200]) if output else "",
@@ -124,19 +156,21 @@ def handle_code_change(data: dict, state_dir: Path) -> dict | None:
         return None
 
     tool_name = data.get("tool_name", "")
+    # Parsed once; the checks below reuse it instead of re-parsing the str.
+    path = Path(file_path)
 
     # Check pre-code trigger BEFORE recording change (file may not exist yet)
-    trigger_output = _check_pre_code(file_path, tool_name, state_dir)
+    trigger_output = _check_pre_code(path, tool_name, state_dir)
 
-    append_event(state_dir, "changes.jsonl", {
+    queue_event(state_dir, "changes.jsonl", {
         "tool": tool_name,
         "file": file_path,
-        "is_config": is_config_file(file_path),
+        "is_config": is_config_file(path),
     })
 
     # Check domain entry trigger after recording
     if trigger_output is None:
-        trigger_output = _check_domain_entry(file_path, state_dir)
+        trigger_output = _check_domain_entry(path, state_dir)
 
     return trigger_output
 
@@ -147,7 +181,7 @@ def handle_research(data: dict, state_dir: Path) -> dict | None:
     if not isinstance(tool_input, dict):
         return None
 
-    append_event(state_dir, "research.jsonl", {
+    queue_event(state_dir, "research.jsonl", {
         "tool": data.get("tool_name", ""),
         "query": str(tool_input.get("query", tool_input.get("url", "")))[:200],
     })
@@ -186,46 +220,44 @@ def handle_trace_consumption(data: dict, state_dir: Path) -> None:
 
     try:
         from local_store import (
-            _get_conn, record_trace_consumed, mark_trace_used_v2,
+            batch, get_conn, record_trace_consumed, mark_trace_used_v2,
             cache_trace_pointer,
         )
         session_id = state_dir.name
         project_id = read_project_id(state_dir)
-        conn = _get_conn()
-        record_trace_consumed(conn, session_id, trace_id)
-        mark_trace_used_v2(conn, trace_id, project_id)
-
-        # Cache trace pointer (title only — no content stored locally)
+        # Parse before opening the transaction — keep the write lock short.
         resp = _parse_tool_response(data)
-        if resp:
-            title = resp.get("title", "")
-            if title:
-                cache_trace_pointer(conn, trace_id, project_id, title,
-                                    source="search")
-        conn.close()
+        conn = get_conn()
+        with batch(conn):
+            record_trace_consumed(conn, session_id, trace_id)
+            mark_trace_used_v2(conn, trace_id, project_id)
+
+            # Cache trace pointer (title only — no content stored locally)
+            if resp:
+                title = resp.get("title", "")
+                if title:
+                    cache_trace_pointer(conn, trace_id, project_id, title,
+                                        source="search")
     except Exception as e:
         log_hook_error("trace_consumption_cache", e)
 
 
 def handle_contribution(data: dict, state_dir: Path) -> None:
     """Handle MCP contribute_trace: record contribution + store locally."""
-    response_text = str(data.get("tool_response", {}))
+    # The new trace's id sits near the top of the contribute response; a
+    # large echoed body past the first 4 KB is never scanned.
+    response_text = str(data.get("tool_response", {}))[:_UUID_SCAN_LIMIT]
 
-    match = re.search(
-        r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-"
-        r"[0-9a-f]{4}-[0-9a-f]{12}", response_text)
-    trace_id = match.group(0) if match else ""
+    trace_id = _find_uuid(response_text)
 
-    append_event(state_dir, "contributions.jsonl", {"trace_id": trace_id})
+    queue_event(state_dir, "contributions.jsonl", {"trace_id": trace_id})
 
     # Record turn count at contribution time so the Stop hook can detect
     # how many user messages came AFTER the contribution
     try:
-        path = state_dir / "user_turn_count"
-        count = int(path.read_text(encoding="utf-8").strip()) if path.exists() else 0
         (state_dir / "user_turns_at_contribution").write_text(
-            str(count), encoding="utf-8")
-    except (ValueError, OSError):
+            str(read_counter(state_dir, "user_turn_count")), encoding="utf-8")
+    except OSError:
         pass
 
     # Cache a pointer to the contributed trace (title only — the API is the
@@ -238,48 +270,70 @@ def handle_contribution(data: dict, state_dir: Path) -> None:
         if isinstance(tool_input, dict):
             title = tool_input.get("title", "")
             if title:
-                from local_store import _get_conn, cache_trace_pointer
-                conn = _get_conn()
-                cache_trace_pointer(conn, trace_id, read_project_id(state_dir),
-                                    title, source="contributed")
-                conn.close()
+                from local_store import cache_trace_pointer, get_conn
+                cache_trace_pointer(get_conn(), trace_id,
+                                    read_project_id(state_dir), title,
+                                    source="contributed")
     except Exception as e:
         log_hook_error("contribution_cache", e)
 
 
 # ── Main ─────────────────────────────────────────────────────────────────
 
+_HANDLERS = {
+    "Bash": handle_bash,
+    "Write": handle_code_change,
+    "Edit": handle_code_change,
+    "NotebookEdit": handle_code_change,
+    "WebSearch": handle_research,
+    "WebFetch": handle_research,
+}
+
+
+def _handler_for(tool_name: str):
+    """Handler for a tool, or None. MCP tool names carry a server prefix."""
+    handler = _HANDLERS.get(tool_name)
+    if handler is None:
+        if "get_trace" in tool_name:
+            handler = handle_trace_consumption
+        elif "contribute_trace" in tool_name:
+            handler = handle_contribution
+    return handler
+
+
 def main() -> None:
     try:
         raw = sys.stdin.read()
-        data = json.loads(raw) if raw.strip() else {}
+        data = json.loads(raw) if raw and not raw.isspace() else {}
     except (json.JSONDecodeError, OSError):
         return
 
     tool_name = data.get("tool_name", "")
     if not tool_name:
         return
+    # Unhandled tools leave no trace: exit before get_state_dir's mkdir.
+    # (The detectors only look at Bash and code tools, all handled.)
+    handler = _handler_for(tool_name)
+    if handler is None:
+        return
 
     state_dir = get_state_dir(data)
     output = None
 
-    # Detect knowledge crystallization on every tool use
-    _detect_knowledge_candidates(tool_name, data, state_dir)
-
-    if tool_name == "Bash":
-        output = handle_bash(data, state_dir)
-
-    elif tool_name in ("Write", "Edit", "NotebookEdit"):
-        output = handle_code_change(data, state_dir)
-
-    elif tool_name in ("WebSearch", "WebFetch"):
-        output = handle_research(data, state_dir)
-
-    elif "get_trace" in tool_name:
-        handle_trace_consumption(data, state_dir)
-
-    elif "contribute_trace" in tool_name:
-        handle_contribution(data, state_dir)
+    try:
+        # Classify a Bash result once; detection and handler share it.
+        bash_result = detect_bash_error(data) if handler is handle_bash else None
+
+        # Detect knowledge crystallization on every tool use
+        _detect_knowledge_candidates(tool_name, data, state_dir, bash_result)
+
+        if bash_result is not None:
+            output = handle_bash(data, state_dir, bash_result)
+        else:
+            output = handler(data, state_dir)
+    finally:
+        # Handlers queue their events; write them once per file here.
+        flush_events()
 
     if output:
         print(json.dumps(output))
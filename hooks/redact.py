@@ -114,5 +114,9 @@ def strip_harness_noise(text: str) -> str:
     """
     if not text:
         return text
+    # Markers never span lines, so a clean buffer has no noisy line: one
+    # whole-text check spares the usual case a lower() and scan per line.
+    if not contains_harness_noise(text):
+        return "\n".join(text.splitlines()).strip()
     kept = [ln for ln in text.splitlines() if not contains_harness_noise(ln)]
     return "\n".join(kept).strip()
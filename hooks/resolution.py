@@ -11,6 +11,7 @@ signature, same command head, correct ordering. Nothing here reads the
 agent's reasoning or the user's messages.
 """
 
+import os
 import re
 import sys
 from pathlib import Path
@@ -18,7 +19,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 import ct_config
 from session_state import (
-    append_event, read_events, error_hash, log_hook_error, read_project_id,
+    queue_event, read_events, error_hash, log_hook_error, read_project_id,
 )
 from redact import redact_command
 
@@ -50,7 +51,7 @@ def record_surfaced(state_dir: Path, sig: str, results: list[dict]) -> None:
     lets pair_resolution attribute them when the same signature resolves.
 
     Structural only: signature, ids, timestamp. No content, no user text.
-    Never raises — append_event already swallows OSError.
+    Never raises — queued, and flush_events swallows OSError.
     """
     if not sig:
         return
@@ -65,7 +66,7 @@ def record_surfaced(state_dir: Path, sig: str, results: list[dict]) -> None:
             ids.append(safe)
     if not ids:
         return
-    append_event(state_dir, SURFACED_FILE, {"sig": sig, "trace_ids": ids[:5]})
+    queue_event(state_dir, SURFACED_FILE, {"sig": sig, "trace_ids": ids[:5]})
 
 
 def _attribute_surfaced_commons(conn, state_dir: Path, sig: str,
@@ -152,18 +153,21 @@ def _pair_resolution(state_dir: Path, command: str,
         err_t = match.get("t", 0)
 
         # Files changed between the error and this success = the fix.
-        # Basenames only — full paths can contain usernames.
+        # Basenames only — full paths can contain usernames. A plain string
+        # split, not a Path per event, and only the first 10 are stored.
         fix_files = []
         for ch in read_events(state_dir, "changes.jsonl"):
             if ch.get("t", 0) >= err_t and ch.get("file"):
-                name = Path(ch["file"]).name
+                name = os.path.basename(ch["file"])
                 if name not in fix_files:
                     fix_files.append(name)
+                    if len(fix_files) == 10:
+                        break
 
         from local_store import (
-            _get_conn, record_resolution, record_trace_consumed,
+            get_conn, record_resolution, record_trace_consumed,
         )
-        conn = _get_conn()
+        conn = get_conn()
         # Commons first, local second — order is load-bearing, not cosmetic.
         # record_trace_consumed attaches to ONE unconsumed trigger row, so when
         # both claims apply the commons trace has to take that row: it carries
@@ -224,7 +228,6 @@ def _pair_resolution(state_dir: Path, command: str,
         trailer_output = None
         if trace_id and not str(trace_id).startswith("local:"):
             trailer_output = _suggest_trailer(state_dir, trace_id)
-        conn.close()
         return trailer_output
     except Exception as e:
         log_hook_error("resolution_pairing", e)
@@ -251,7 +254,7 @@ def _suggest_trailer(state_dir: Path, trace_id: str) -> dict | None:
                  read_events(state_dir, "trailer_suggested.jsonl")}
     if safe_id in suggested:
         return None
-    append_event(state_dir, "trailer_suggested.jsonl", {"trace_id": safe_id})
+    queue_event(state_dir, "trailer_suggested.jsonl", {"trace_id": safe_id})
     parts = [
         f"CommonTrace: trace {safe_id} contributed to this fix. "
         f"If a commit comes out of it, the disclosure trailer is:\n"
@@ -13,24 +13,33 @@ consumption record, with an epsilon-greedy floor so a suppressed trigger
 never dies permanently.
 """
 
+import hashlib
 import json
+import os
 import re
 import sys
 import time
-import urllib.error
-import urllib.request
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 import ct_config
-from session_state import append_event, log_hook_error, read_project_id
+from languages import EXTENSION_TO_LANGUAGE
+from session_state import (
+    log_hook_error, queue_event, read_context_fingerprint, read_project_id,
+    read_trigger_stats,
+)
 from redact import redact_text
 
-EXTENSION_TO_LANGUAGE = {
-    ".py": "python", ".ts": "typescript", ".tsx": "typescript",
-    ".jsx": "javascript", ".js": "javascript", ".go": "go",
-    ".rs": "rust", ".java": "java", ".rb": "ruby",
-}
+
+def _lang_of(file_path: str | Path) -> str | None:
+    """Language for a source file's extension, or None.
+
+    A plain splitext on the string — no Path parse for the common non-source
+    edit (.json, .md, .lock) that bails out here. Same suffix rule as
+    Path.suffix, including dotfiles having none.
+    """
+    return EXTENSION_TO_LANGUAGE.get(
+        os.path.splitext(os.fspath(file_path))[1].lower())
 
 
 # ── Cooldowns ────────────────────────────────────────────────────────────
@@ -41,24 +50,27 @@ def _cooldown_dir() -> Path:
 
 
 def is_on_cooldown(trigger_name: str, seconds: int) -> bool:
-    """Per-trigger cooldown check."""
-    path = _cooldown_dir() / f"{trigger_name}.ts"
+    """Per-trigger cooldown check — a single stat of the marker's mtime."""
     try:
-        if path.exists():
-            last = float(path.read_text(encoding="utf-8"))
-            if time.time() - last < seconds:
-                return True
-    except (ValueError, OSError):
-        pass
-    return False
+        st = os.stat(_cooldown_dir() / f"{trigger_name}.ts")
+    except OSError:
+        return False
+    return time.time() - st.st_mtime < seconds
 
 
 def set_cooldown(trigger_name: str) -> None:
-    """Set cooldown timestamp for a trigger."""
-    _cooldown_dir().mkdir(parents=True, exist_ok=True)
+    """Set cooldown for a trigger: the marker file's mtime is the timestamp.
+
+    The directory is created only when the touch finds it missing, not
+    stat-and-mkdir'd on every fire.
+    """
+    marker = _cooldown_dir() / f"{trigger_name}.ts"
     try:
-        (_cooldown_dir() / f"{trigger_name}.ts").write_text(
-            str(time.time()), encoding="utf-8")
+        try:
+            marker.touch()
+        except FileNotFoundError:
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
     except OSError:
         pass
 
@@ -75,15 +87,18 @@ def _exploration_due(trigger_name: str) -> bool:
     its way back when the corpus or the project changes — the search
     rate never decays to zero (spec §4.1).
     """
-    _cooldown_dir().mkdir(parents=True, exist_ok=True)
     path = _cooldown_dir() / f"{trigger_name}.suppressed"
     try:
-        count = int(path.read_text(encoding="utf-8")) if path.exists() else 0
+        count = int(path.read_text(encoding="utf-8"))
     except (ValueError, OSError):
         count = 0
     count += 1
     try:
-        path.write_text(str(count), encoding="utf-8")
+        try:
+            path.write_text(str(count), encoding="utf-8")
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(str(count), encoding="utf-8")
     except OSError:
         return False
     return count % EXPLORATION_EVERY == 0
@@ -103,11 +118,10 @@ def _get_adaptive_cooldown(trigger_name: str, base_seconds: int,
     get_trigger_effectiveness, key "fired"; "total" kept as a legacy
     fallback for old bridge files).
     """
+    stats = read_trigger_stats(state_dir)
+    if not stats:
+        return base_seconds
     try:
-        stats_path = state_dir / "trigger_stats.json"
-        if not stats_path.exists():
-            return base_seconds
-        stats = json.loads(stats_path.read_text(encoding="utf-8"))
         trigger_data = stats.get(trigger_name)
         if not trigger_data:
             return base_seconds
@@ -119,7 +133,7 @@ def _get_adaptive_cooldown(trigger_name: str, base_seconds: int,
             return base_seconds * 3
         if rate >= 0.4:
             return max(base_seconds // 2, 5)
-    except (json.JSONDecodeError, OSError, TypeError):
+    except (AttributeError, OSError, TypeError):
         pass
     return base_seconds
 
@@ -127,26 +141,91 @@ def _get_adaptive_cooldown(trigger_name: str, base_seconds: int,
 def _record_trigger_safe(state_dir: Path, trigger_name: str) -> None:
     """Record a trigger fire for reinforcement tracking. Never fails."""
     try:
-        from local_store import _get_conn, record_trigger
-        session_id = state_dir.name
-        conn = _get_conn()
-        record_trigger(conn, session_id, trigger_name)
-        conn.close()
+        from local_store import get_conn, record_trigger
+        record_trigger(get_conn(), state_dir.name, trigger_name)
     except Exception as e:
         log_hook_error("record_trigger", e)
 
 
 # ── Search ───────────────────────────────────────────────────────────────
 
+# Identical searches within this window reuse the stored hits: a debugging
+# loop re-triggers the same error, and the commons doesn't change that fast.
+_SEARCH_CACHE_TTL = 600
+_SEARCH_CACHE_MAX = 500
+
+# After a search fails for want of a backend, later hooks skip the network
+# for this long instead of each waiting out the full timeout. Recorded as a
+# cooldown marker, so it is shared across hook processes.
+_BACKEND_DOWN_COOLDOWN = 60
+
+
+def _search_cache_file(url: str, payload: bytes) -> Path:
+    """Cache entry for one exact request (endpoint + body).
+
+    Resolved at call time so tests can redirect ct_config.SEARCH_CACHE_DIR.
+    """
+    key = hashlib.blake2b(url.encode("utf-8") + b"\0" + payload,
+                          digest_size=16).hexdigest()
+    return ct_config.SEARCH_CACHE_DIR / f"{key}.json"
+
+
+def _read_search_cache(path: Path) -> list | None:
+    """Stored hits if the entry is fresh, else None. Never raises."""
+    try:
+        if time.time() - os.stat(path).st_mtime >= _SEARCH_CACHE_TTL:
+            return None
+        results = json.loads(path.read_bytes())
+    except (json.JSONDecodeError, OSError):
+        return None
+    return results if isinstance(results, list) else None
+
+
+def _write_search_cache(path: Path, results: list) -> None:
+    """Store hits atomically, evicting the oldest past the cap. Never raises."""
+    import tempfile
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(results, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        entries = list(path.parent.glob("*.json"))
+        if len(entries) > _SEARCH_CACHE_MAX:
+            entries.sort(key=lambda p: p.stat().st_mtime)
+            for old in entries[:len(entries) - _SEARCH_CACHE_MAX]:
+                old.unlink()
+    except OSError as e:
+        log_hook_error("search_cache", e)
+
+
 def search_commontrace(query: str, api_key: str,
                        context: dict | None = None) -> list[dict]:
     body: dict = {"q": query, "limit": 3}
     if context:
         body["context"] = context
     payload = json.dumps(body).encode("utf-8")
+    url = f"{ct_config.api_base_url()}/api/v1/traces/search"
+
+    cache_file = _search_cache_file(url, payload)
+    results = _read_search_cache(cache_file)
+    if results is not None:
+        return results
+    if is_on_cooldown("backend_down", _BACKEND_DOWN_COOLDOWN):
+        return []
+
+    # Imported here, not at module top: urllib.request drags in http.client,
+    # email and friends, and most hook runs never reach a search.
+    import urllib.error
+    import urllib.request
 
     req = urllib.request.Request(
-        f"{ct_config.api_base_url()}/api/v1/traces/search",
+        url,
         data=payload,
         method="POST",
         headers={
@@ -158,7 +237,7 @@ def search_commontrace(query: str, api_key: str,
     try:
         with urllib.request.urlopen(req, timeout=3) as response:
             data = json.loads(response.read())
-            return data.get("results", [])
+            results = data.get("results", [])
     except (urllib.error.URLError, urllib.error.HTTPError,
             json.JSONDecodeError, OSError) as e:
         # Status-bearing network POST (domain-entry knowledge search). An empty
@@ -166,7 +245,16 @@ def search_commontrace(query: str, api_key: str,
         # silent-success trap — so a failed search silently drops the injection.
         # Log the real cause locally; still return [] so the hook proceeds.
         log_hook_error("search_commontrace", e)
+        # Unreachable, timed out, or a 5xx: the next minute of searches
+        # would fail the same way. A 4xx or a garbled body is this
+        # request's problem, not the backend's.
+        if isinstance(e, OSError) and getattr(e, "code", 500) >= 500:
+            set_cooldown("backend_down")
         return []
+    # Only an answered search is cached; a failure is retried next time.
+    if isinstance(results, list):
+        _write_search_cache(cache_file, results)
+    return results
 
 
 def format_results(results: list[dict]) -> str:
@@ -193,12 +281,18 @@ def _injection(text: str) -> dict:
     }
 
 
-def _search_injection(query: str, preamble: str) -> dict | None:
-    """Search the commons and format the hit list, or None if nothing lands."""
+def _search_injection(query: str, preamble: str,
+                      state_dir: Path | None = None) -> dict | None:
+    """Search the commons and format the hit list, or None if nothing lands.
+
+    With a state_dir, the session's context fingerprint rides along so the
+    server ranks the same way it did for the session-start search.
+    """
     api_key = ct_config.load_api_key()
     if not api_key:
         return None
-    results = search_commontrace(query, api_key)
+    context = read_context_fingerprint(state_dir) if state_dir else None
+    results = search_commontrace(query, api_key, context)
     if not results:
         return None
     return _injection(
@@ -215,19 +309,21 @@ def search_on_bash_error(state_dir: Path, error_text: str) -> list[dict]:
     caller also has to remember which traces were surfaced for this error
     signature — see resolution.record_surfaced.
     """
-    if is_on_cooldown("bash_error",
-                      _get_adaptive_cooldown("bash_error", 30, state_dir)):
-        return []
     api_key = ct_config.load_api_key()
     if not api_key:
         return []
+    if is_on_cooldown("bash_error",
+                      _get_adaptive_cooldown("bash_error", 30, state_dir)):
+        return []
     set_cooldown("bash_error")
     _record_trigger_safe(state_dir, "bash_error")
     # M19: redact before the error text leaves the machine as a search query.
-    query = redact_text(error_text.strip()[-200:])
+    # Slice before stripping so a huge error_text isn't scanned end to end.
+    query = redact_text(error_text[-400:].strip()[-200:])
     if not query:
         return []
-    return search_commontrace(query, api_key)
+    return search_commontrace(query, api_key,
+                              read_context_fingerprint(state_dir))
 
 
 def format_error_hits(results: list[dict]) -> dict:
@@ -255,10 +351,8 @@ def _check_error_recurrence(sig: str, state_dir: Path) -> dict | None:
 
     info = None
     try:
-        from local_store import _get_conn, record_error_signature
-        conn = _get_conn()
-        info = record_error_signature(conn, project_id, sig)
-        conn.close()
+        from local_store import get_conn, record_error_signature
+        info = record_error_signature(get_conn(), project_id, sig)
     except Exception as e:
         log_hook_error("error_recurrence", e)
         return None
@@ -271,7 +365,7 @@ def _check_error_recurrence(sig: str, state_dir: Path) -> dict | None:
         return None
     set_cooldown("error_recurrence")
     _record_trigger_safe(state_dir, "error_recurrence")
-    append_event(state_dir, "recurrence_injected.jsonl", {"sig": sig})
+    queue_event(state_dir, "recurrence_injected.jsonl", {"sig": sig})
 
     when = time.strftime("%Y-%m-%d",
                          time.localtime(info.get("last_seen_at", 0)))
@@ -292,39 +386,45 @@ def _check_error_recurrence(sig: str, state_dir: Path) -> dict | None:
     return _injection(" ".join(parts))
 
 
-def _check_pre_code(file_path: str, tool_name: str,
+def _check_pre_code(file_path: str | Path, tool_name: str,
                     state_dir: Path = None) -> dict | None:
     """Trigger search before implementing a new file."""
     if tool_name != "Write":
         return None
-    cd = _get_adaptive_cooldown("pre_code", 180, state_dir) if state_dir else 180
-    if is_on_cooldown("pre_code", cd):
+    lang = _lang_of(file_path)
+    if not lang:
         return None
-    if Path(file_path).exists():
+    # Overwriting an existing file is not "new code": one stat settles it
+    # before the trigger-stats read and cooldown stat below.
+    path = Path(file_path)
+    if path.exists():
         return None
-
-    lang = EXTENSION_TO_LANGUAGE.get(Path(file_path).suffix.lower())
-    if not lang:
+    # pre_code's only output is a commons search: without a key it would
+    # burn a cooldown and a trigger row on a search that can't run.
+    if not ct_config.load_api_key():
+        return None
+    cd = _get_adaptive_cooldown("pre_code", 180, state_dir) if state_dir else 180
+    if is_on_cooldown("pre_code", cd):
         return None
 
     set_cooldown("pre_code")
     if state_dir:
         _record_trigger_safe(state_dir, "pre_code")
-    name = Path(file_path).stem.lower()
     return _search_injection(
-        f"{lang} {name} implementation patterns",
-        f"Before implementing {Path(file_path).name}, "
-        f"CommonTrace found relevant patterns:")
+        f"{lang} {path.stem.lower()} implementation patterns",
+        f"Before implementing {path.name}, "
+        f"CommonTrace found relevant patterns:", state_dir)
 
 
-def _check_domain_entry(file_path: str, state_dir: Path) -> dict | None:
+def _check_domain_entry(file_path: str | Path,
+                        state_dir: Path) -> dict | None:
     """Trigger search when entering a language different from the project's."""
-    if is_on_cooldown("domain_entry",
-                      _get_adaptive_cooldown("domain_entry", 120, state_dir)):
+    lang = _lang_of(file_path)
+    if not lang:
         return None
 
-    lang = EXTENSION_TO_LANGUAGE.get(Path(file_path).suffix.lower())
-    if not lang:
+    if is_on_cooldown("domain_entry",
+                      _get_adaptive_cooldown("domain_entry", 120, state_dir)):
         return None
 
     project_id = read_project_id(state_dir)
@@ -332,13 +432,17 @@ def _check_domain_entry(file_path: str, state_dir: Path) -> dict | None:
         return None
 
     try:
-        from local_store import _get_conn, get_project_context_by_id
-        conn = _get_conn()
-        # Resolve by the registered project_id (session cwd), NOT the edited
-        # file's parent dir — files under src/, api/, lib/… would otherwise
-        # miss the exact WHERE path=? lookup and never fire this pattern.
-        ctx = get_project_context_by_id(conn, project_id)
-        conn.close()
+        # session_start already looked the project up and left its context
+        # in the fingerprint bridge; the database is only the fallback.
+        ctx = read_context_fingerprint(state_dir)
+        if not ctx or ctx.get("project_id") != project_id:
+            from local_store import get_conn, get_project_context_by_id
+            # Resolve by the registered project_id (session cwd), NOT the
+            # edited file's parent dir — files under src/, api/, lib/… would
+            # otherwise miss the exact WHERE path=? lookup and never fire
+            # this pattern. The process-cached connection is shared with
+            # _record_trigger_safe.
+            ctx = get_project_context_by_id(get_conn(), project_id)
 
         # Fire when editing in a language different from the primary language
         if ctx and ctx.get("language") != lang:
@@ -348,7 +452,7 @@ def _check_domain_entry(file_path: str, state_dir: Path) -> dict | None:
                 f"{lang} common patterns and gotchas",
                 f"You're working in {lang} "
                 f"(project primary: {ctx.get('language', 'unknown')}). "
-                f"CommonTrace found relevant knowledge:")
+                f"CommonTrace found relevant knowledge:", state_dir)
     except Exception as e:
         log_hook_error("domain_entry", e)
     return None
@@ -24,7 +24,7 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from session_state import read_events
+from session_state import EventCache
 
 IMPORTANCE_THRESHOLD = 4.0
 
@@ -65,6 +65,8 @@ _EVIDENCE_LIST_CAP = 3
 # adjusted once its mapped triggers have fired at least MIN_FIRED times, so
 # cold-start sessions leave scoring untouched.
 MIN_FIRED = 3
+# Largest multiplier reinforcement can apply to a pattern score.
+REINFORCEMENT_CAP = 1.3
 
 # Map a scored detection pattern to the trigger name(s) whose track record
 # should reinforce it. Patterns absent from this map are never adjusted.
@@ -114,18 +116,19 @@ def _apply_reinforcement(scores, effectiveness):
         e = _pattern_effectiveness(pattern, effectiveness)
         if not e or e["fired"] < MIN_FIRED:
             continue
-        scores[pattern] *= _clamp(1.0, 1.3, 0.85 + 0.5 * e["rate"])
+        scores[pattern] *= _clamp(1.0, REINFORCEMENT_CAP,
+                                  0.85 + 0.5 * e["rate"])
 
 
-def _score_error_resolution(state_dir, scores, evidence):
+def _score_error_resolution(events, scores, evidence):
     """error → change → verified success, read straight off the event streams.
 
     The only pattern with no candidate row: it is a property of the whole
     session's ordering, not of any single tool call.
     """
-    errors = read_events(state_dir, "errors.jsonl")
-    changes = read_events(state_dir, "changes.jsonl")
-    resolutions = read_events(state_dir, "resolutions.jsonl")
+    errors = events.get("errors.jsonl")
+    changes = events.get("changes.jsonl")
+    resolutions = events.get("resolutions.jsonl")
     if not (errors and changes and resolutions):
         return
     first_error_t = min(e.get("t", 0) for e in errors)
@@ -182,19 +185,40 @@ def _apply_temporal_proximity(candidates, scores):
                 break
 
 
+def can_reach_threshold(events: EventCache) -> bool:
+    """Cheap pre-check: could compute_importance reach IMPORTANCE_THRESHOLD?
+
+    Without a candidate row only error_resolution can score, and even fully
+    reinforced it may fall short of the threshold — the common trivial
+    session is then settled by stat()s instead of the effectiveness query
+    and a scoring pass. False only when the score is certain to fall short.
+    """
+    if events.has("candidates.jsonl"):
+        return True
+    if PATTERN_WEIGHTS["error_resolution"] * REINFORCEMENT_CAP < IMPORTANCE_THRESHOLD:
+        return False
+    return all(events.has(f) for f in
+               ("errors.jsonl", "changes.jsonl", "resolutions.jsonl"))
+
+
 def compute_importance(state_dir: Path,
-                       effectiveness: dict | None = None
+                       effectiveness: dict | None = None,
+                       events: EventCache | None = None
                        ) -> tuple[float, str, dict]:
     """Compute the weighted importance score from all structural signals.
 
+    events is the caller's EventCache, so a Stop run that scores twice and
+    then builds a candidate parses each JSONL file once.
+
     Returns: (total_score, top_pattern_name, evidence_for_top_pattern)
     """
-    candidates = read_events(state_dir, "candidates.jsonl")
+    events = events or EventCache(state_dir)
+    candidates = events.get("candidates.jsonl")
 
     scores: dict[str, float] = {}
     evidence: dict[str, dict] = {}
 
-    _score_error_resolution(state_dir, scores, evidence)
+    _score_error_resolution(events, scores, evidence)
     _score_candidates(candidates, scores, evidence)
     _apply_temporal_proximity(candidates, scores)
     _apply_reinforcement(scores, effectiveness)
@@ -18,40 +18,44 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 import ct_config
 from scoring import compute_importance
-from session_state import read_events, log_hook_error
+from session_state import EventCache, read_project_id, log_hook_error
 
 
-def _persist_session(data: dict, state_dir: Path) -> None:
+def _persist_session(data: dict, state_dir: Path,
+                     events: EventCache | None = None) -> None:
     """Persist session stats to SQLite working memory store."""
+    events = events or EventCache(state_dir)
     try:
         from local_store import (
-            _get_conn, end_session, prune_stale_cache,
+            batch, end_session, get_conn, prune_stale_cache,
         )
-        conn = _get_conn()
+        conn = get_conn()
         session_id = data.get("session_id") or str(os.getppid())
 
-        errors = read_events(state_dir, "errors.jsonl")
-        resolutions = read_events(state_dir, "resolutions.jsonl")
-        contributions = read_events(state_dir, "contributions.jsonl")
+        errors = events.get("errors.jsonl")
+        resolutions = events.get("resolutions.jsonl")
+        contributions = events.get("contributions.jsonl")
 
         # Compute importance for session metadata
-        score, top_pattern, _ = compute_importance(state_dir)
-
-        end_session(conn, session_id, {
-            "error_count": len(errors),
-            "resolution_count": len(resolutions),
-            "contribution_count": len(contributions),
-        }, top_pattern=top_pattern, importance_score=score)
-
-        # Prune stale cache entries
-        prune_stale_cache(conn)
-
-        conn.close()
+        score, top_pattern, _ = compute_importance(state_dir, events=events)
+
+        # The session row and the TTL prune share one transaction: one
+        # commit and one WAL sync on the way out instead of two.
+        with batch(conn):
+            end_session(conn, session_id, {
+                "error_count": len(errors),
+                "resolution_count": len(resolutions),
+                "contribution_count": len(contributions),
+            }, top_pattern=top_pattern, importance_score=score)
+
+            # Prune stale cache entries
+            prune_stale_cache(conn)
     except Exception as e:
         log_hook_error("persist_session", e)
 
 
-def _book_savings(data: dict, state_dir: Path) -> None:
+def _book_savings(data: dict, state_dir: Path,
+                  events: EventCache | None = None) -> None:
     """Book measured-inbound savings for trace-attributed recurrences.
 
     INBOUND ONLY (what the commons saved you). For each error signature in
@@ -61,48 +65,46 @@ def _book_savings(data: dict, state_dir: Path) -> None:
       tokens  = measured message.usage over the session window
     Wrapped end-to-end so it can never crash the Stop hook. No LLM.
     """
+    events = events or EventCache(state_dir)
     try:
         from savings import sum_usage
         import local_store
 
-        project_id_path = state_dir / "project_id"
-        if not project_id_path.exists():
+        project_id = read_project_id(state_dir)
+        if project_id is None:
             return
-        project_id = int(project_id_path.read_text(encoding="utf-8").strip())
 
         times = [e["t"] for e in
-                 read_events(state_dir, "resolutions.jsonl")
-                 + read_events(state_dir, "errors.jsonl")
+                 events.get("resolutions.jsonl")
+                 + events.get("errors.jsonl")
                  if "t" in e]
         if not times:
             return
         floor = min(times) - 5
 
-        conn = local_store._get_conn()
-        try:
-            rows = conn.execute(
-                "SELECT created_at, resolved_at FROM error_signatures "
-                "WHERE project_id = ? AND trace_id IS NOT NULL "
-                "AND resolved_at IS NOT NULL AND resolved_at >= ?",
-                (project_id, floor),
-            ).fetchall()
-            if not rows:
-                return
-            minutes = sum(
-                min(max(r["resolved_at"] - r["created_at"], 0) / 60.0, 120.0)
-                for r in rows)
-            tokens = sum_usage(
-                data.get("transcript_path", ""), min(times) - 5, max(times) + 5)
-            local_store.book_session_saving(
-                conn, project_id, data.get("session_id", ""), minutes, tokens)
-            conn.commit()
-        finally:
-            conn.close()
+        conn = local_store.get_conn()
+        rows = conn.execute(
+            "SELECT created_at, resolved_at FROM error_signatures "
+            "WHERE project_id = ? AND trace_id IS NOT NULL "
+            "AND resolved_at IS NOT NULL AND resolved_at >= ?",
+            (project_id, floor),
+        ).fetchall()
+        if not rows:
+            return
+        minutes = sum(
+            min(max(r["resolved_at"] - r["created_at"], 0) / 60.0, 120.0)
+            for r in rows)
+        tokens = sum_usage(
+            data.get("transcript_path", ""), min(times) - 5, max(times) + 5)
+        local_store.book_session_saving(
+            conn, project_id, data.get("session_id", ""), minutes, tokens)
+        conn.commit()
     except Exception as e:
         log_hook_error("book_savings", e)
 
 
-def _session_counters(conn, state_dir: Path, project_id) -> dict:
+def _session_counters(conn, state_dir: Path, project_id,
+                      events: EventCache | None = None) -> dict:
     """Per-session aggregates for the assisted-resolution north-star (§4.3).
 
     Scoped to THIS session: trigger_feedback rows keyed by state_dir.name,
@@ -127,7 +129,7 @@ def _session_counters(conn, state_dir: Path, project_id) -> dict:
     except Exception as e:
         log_hook_error("session_counters_triggers", e)
     try:
-        resolutions = read_events(state_dir, "resolutions.jsonl")
+        resolutions = (events or EventCache(state_dir)).get("resolutions.jsonl")
         counters["resolutions_total"] = len(resolutions)
         if resolutions and project_id is not None:
             floor = min(e.get("t", 0) for e in resolutions) - 5.0
@@ -144,7 +146,8 @@ def _session_counters(conn, state_dir: Path, project_id) -> dict:
     return counters
 
 
-def _report_trigger_stats(data: dict, state_dir: Path) -> None:
+def _report_trigger_stats(data: dict, state_dir: Path,
+                          events: EventCache | None = None) -> None:
     """Send anonymized trigger effectiveness stats to the API.
 
     M22: Only sends if user has opted in via telemetry=true in config.
@@ -153,20 +156,14 @@ def _report_trigger_stats(data: dict, state_dir: Path) -> None:
         # M22: Check telemetry consent before sending. No config = no consent.
         if not ct_config.read_config().get("telemetry", False):
             return
-        from local_store import _get_conn, get_trigger_effectiveness
-        import urllib.request
+        from local_store import get_conn, get_trigger_effectiveness
 
         session_id = data.get("session_id") or str(os.getppid())
-        project_id_path = state_dir / "project_id"
-        project_id = None
-        if project_id_path.exists():
-            project_id = int(
-                project_id_path.read_text(encoding="utf-8").strip())
+        project_id = read_project_id(state_dir)
 
-        conn = _get_conn()
+        conn = get_conn()
         stats = get_trigger_effectiveness(conn, project_id)
-        counters = _session_counters(conn, state_dir, project_id)
-        conn.close()
+        counters = _session_counters(conn, state_dir, project_id, events)
 
         if not stats and not any(counters.values()):
             return
@@ -178,16 +175,59 @@ def _report_trigger_stats(data: dict, state_dir: Path) -> None:
 
         body = {"trigger_stats": stats, "session_id": session_id}
         body.update(counters)
-        payload = json.dumps(body).encode("utf-8")
+        _post_detached(f"{base_url}/api/v1/telemetry/triggers", body, api_key)
+    except Exception as e:
+        log_hook_error("report_trigger_stats", e)
 
+
+def _post_detached(url: str, body: dict, api_key: str):
+    """Hand a telemetry POST to a detached child and return at once.
+
+    The Stop hook used to wait on this request, up to its whole timeout on a
+    bad network, at the end of every session. A thread can't outlive the
+    hook's interpreter, so the request runs in `python3 session_report.py
+    post`, detached from the hook: its own session on POSIX, and on Windows
+    its own process group with no console (start_new_session is ignored
+    there). The request goes over stdin, keeping the API key out of argv.
+    Returns the child's Popen; raises OSError if it can't be started.
+    """
+    import subprocess
+
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.DETACHED_PROCESS
+                  | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "post"],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, **detach,
+    )
+    with proc.stdin:
+        proc.stdin.write(json.dumps(
+            {"url": url, "body": body, "api_key": api_key}).encode("utf-8"))
+    return proc
+
+
+def _post_from_stdin() -> None:
+    """The detached half of _post_detached. Never raises."""
+    try:
+        import urllib.request
+
+        job = json.loads(sys.stdin.buffer.read())
         req = urllib.request.Request(
-            f"{base_url}/api/v1/telemetry/triggers",
-            data=payload, method="POST",
+            job["url"],
+            data=json.dumps(job["body"]).encode("utf-8"), method="POST",
             headers={
                 "Content-Type": "application/json",
-                "X-API-Key": api_key,
+                "X-API-Key": job["api_key"],
             },
         )
-        urllib.request.urlopen(req, timeout=2)
+        urllib.request.urlopen(req, timeout=5).close()
     except Exception as e:
         log_hook_error("report_trigger_stats", e)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["post"]:
+        _post_from_stdin()
@@ -16,14 +16,16 @@ import json
 import os
 import re
 import shutil
-import subprocess
 import sys
-import tempfile
-import urllib.error
-import urllib.request
-import uuid
+import threading
+import time
 from pathlib import Path
 
+# urllib.request (which drags in http.client, email and ssl), subprocess,
+# tempfile and uuid are imported inside the functions that use them: a
+# session outside a git repo, or one whose daily checks are done, never
+# touches them, and they were over half of this module's import time.
+
 # Defensive (Issue 9): hook payloads arrive as UTF-8 JSON on stdin, but some
 # Windows consoles default stdin to cp1252 and mangle non-ASCII into mojibake
 # before we parse it. Force UTF-8 with errors="replace" (root cause is likely
@@ -33,6 +35,9 @@ try:
 except Exception:
     pass
 
+sys.path.insert(0, str(Path(__file__).parent))
+from languages import EXTENSION_TO_LANGUAGE, SOURCE_EXTENSIONS
+
 
 # Resolve the `claude` CLI once at import. On Windows the CLI is an
 # extensionless sh-shim next to a `claude.CMD`/`claude.EXE` launcher;
@@ -90,12 +95,6 @@ FIRST_RUN_NOTICE_DEGRADED = (
     "in config.json). Do not include the actual key in your reply to the user."
 )
 
-SOURCE_EXTENSIONS = {".py", ".ts", ".js", ".tsx", ".jsx", ".go", ".rs", ".java", ".rb"}
-EXTENSION_TO_LANGUAGE = {
-    ".py": "python", ".ts": "typescript", ".tsx": "typescript",
-    ".jsx": "javascript", ".js": "javascript", ".go": "go",
-    ".rs": "rust", ".java": "java", ".rb": "ruby",
-}
 
 
 def _log_swallowed(where: str, exc: BaseException) -> None:
@@ -118,12 +117,10 @@ def _log_swallowed(where: str, exc: BaseException) -> None:
 
 def load_config() -> dict:
     """Load stored config or return empty dict."""
-    if CONFIG_FILE.exists():
-        try:
-            return json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, OSError):
-            pass
-    return {}
+    try:
+        return json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
 
 
 def save_config(config: dict) -> None:
@@ -137,6 +134,8 @@ def save_config(config: dict) -> None:
     the persisted file's ACL is additionally restricted to the current user via
     icacls (best-effort, never blocks). No-op on POSIX.
     """
+    import tempfile
+
     try:
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
         CONFIG_DIR.chmod(0o700)
@@ -167,6 +166,9 @@ def save_config(config: dict) -> None:
 def provision_api_key() -> str | None:
     """Generate a new API key via the CommonTrace API. Returns raw key or None."""
     import secrets
+    import urllib.error
+    import urllib.request
+
     anon_id = secrets.token_hex(4)
     payload = json.dumps({
         "email": f"agent-{anon_id}@commontrace.auto",
@@ -195,6 +197,8 @@ def provision_api_key() -> str | None:
 def _post_json(path: str, payload: dict, api_key: str, timeout: float = 3.0) -> bool:
     """POST JSON to API with X-API-Key. Returns True on 2xx, False otherwise.
     Always silent telemetry must never affect the user-facing session."""
+    import urllib.request
+
     base_url = os.environ.get("COMMONTRACE_API_BASE_URL", API_BASE).rstrip("/")
     data = json.dumps(payload).encode("utf-8")
     req = urllib.request.Request(
@@ -232,10 +236,8 @@ def maybe_ping(api_key: str) -> None:
     import datetime as _dt
     today = _dt.datetime.utcnow().date().isoformat()
     try:
-        if PING_MARKER.exists():
-            last = PING_MARKER.read_text(encoding="utf-8").strip()
-            if last == today:
-                return
+        if PING_MARKER.read_text(encoding="utf-8").strip() == today:
+            return
     except OSError:
         pass
     if _post_json("/api/v1/telemetry/ping", {}, api_key, timeout=2.0):
@@ -269,11 +271,13 @@ def maybe_check_update(config: dict) -> str:
     import datetime as _dt
     today = _dt.datetime.now(_dt.timezone.utc).date().isoformat()
     try:
-        if UPDATE_MARKER.exists() and UPDATE_MARKER.read_text(encoding="utf-8").strip() == today:
+        if UPDATE_MARKER.read_text(encoding="utf-8").strip() == today:
             return ""
     except OSError:
         pass
 
+    import urllib.request
+
     latest = ""
     try:
         req = urllib.request.Request(
@@ -315,6 +319,8 @@ def configure_mcp(api_key: str) -> bool:
     The remove step is best-effort (ignore return code) so re-running
     after a partial failure always produces a clean registration.
     """
+    import subprocess
+
     try:
         # Best-effort remove first (idempotency ignore all errors)
         try:
@@ -554,6 +560,24 @@ def _in_git_repo(cwd_path: Path) -> bool:
     return False
 
 
+_SCAN_CHECK_EVERY = 256  # files counted between plurality checks
+
+
+def _clear_leader(counts: dict[str, int]) -> bool:
+    """True once one extension has at least twice the runner-up's count.
+
+    Only the primary language is used; past that margin, walking the rest of
+    a large monorepo would not change the answer.
+    """
+    first = second = 0
+    for n in counts.values():
+        if n > first:
+            first, second = n, first
+        elif n > second:
+            second = n
+    return first >= 2 * second
+
+
 def _scan_languages(cwd_path: Path, max_depth: int = 4,
                     max_files: int = 4000) -> dict[str, int]:
     """Count source files by extension, recursively but bounded.
@@ -562,7 +586,8 @@ def _scan_languages(cwd_path: Path, max_depth: int = 4,
     sitting directly in cwd. A monorepo root whose source lives under ``api/``,
     ``ops/`` etc. has none at the top level → no language detected → the hook
     bailed and never surfaced anything. Walk a few levels deep (skipping deps
-    and build output, capped) so nested layouts register.
+    and build output, capped) so nested layouts register. The walk also stops
+    early once one extension clearly leads (see _clear_leader).
     """
     counts: dict[str, int] = {}
     seen = 0
@@ -584,12 +609,98 @@ def _scan_languages(cwd_path: Path, max_depth: int = 4,
                     seen += 1
                     if seen >= max_files:
                         return counts
+                    if seen % _SCAN_CHECK_EVERY == 0 and _clear_leader(counts):
+                        return counts
     except OSError:
         return counts
     return counts
 
 
-def detect_context(cwd: str) -> str | None:
+# Framework keywords per manifest, in priority order; the tuple order picks
+# the winner when a manifest declares more than one.
+_FRAMEWORK_MANIFESTS = tuple(
+    (name, frameworks, re.compile("|".join(frameworks)))
+    for name, frameworks in (
+        ("pyproject.toml", ("fastapi", "django", "flask")),
+        ("package.json", ("next", "react", "express", "vue")),
+    )
+)
+# A manifest past this size is not parsed; its head is text-scanned instead.
+_MANIFEST_MAX = 1 << 20
+# How much of an unparseable manifest the text scan reads. Dependencies sit
+# near the top.
+_MANIFEST_HEAD = 32768
+# The distribution name at the start of a PEP 508 requirement string.
+_REQUIREMENT_NAME_RE = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def _pyproject_dependencies(data: dict) -> set[str]:
+    """Names from [project] (incl. optional) and [tool.poetry] dependencies."""
+    project = data.get("project", {})
+    reqs = list(project.get("dependencies", []))
+    for extra in project.get("optional-dependencies", {}).values():
+        reqs.extend(extra)
+    names = set()
+    for req in reqs:
+        m = _REQUIREMENT_NAME_RE.match(req)
+        if m:
+            names.add(m.group(1))
+    poetry = data.get("tool", {}).get("poetry", {})
+    tables = [poetry.get("dependencies", {}), poetry.get("dev-dependencies", {})]
+    tables.extend(g.get("dependencies", {})
+                  for g in poetry.get("group", {}).values())
+    for table in tables:
+        names.update(table)
+    return names
+
+
+def _declared_dependencies(name: str, raw: bytes) -> set[str] | None:
+    """Lowercased dependency names a manifest declares, or None when it can't
+    be parsed (malformed, unexpected shape, or no tomllib before 3.11)."""
+    try:
+        if name == "package.json":
+            data = json.loads(raw)
+            names = set()
+            for key in ("dependencies", "devDependencies"):
+                names.update(data.get(key, {}))
+        else:
+            import tomllib
+            names = _pyproject_dependencies(tomllib.loads(raw.decode("utf-8")))
+    except (ImportError, ValueError, TypeError, AttributeError):
+        return None
+    return {n.lower() for n in names if isinstance(n, str)}
+
+
+def _manifest_framework(cwd_path: Path) -> str | None:
+    """Framework declared in pyproject.toml, else package.json, else None.
+
+    Only declared dependencies count: a framework named in a comment, a
+    description or a script no longer tags the project. A manifest that
+    can't be parsed falls back to a keyword scan of its head.
+    """
+    for name, frameworks, pattern in _FRAMEWORK_MANIFESTS:
+        try:
+            with open(cwd_path / name, "rb") as f:
+                raw = f.read(_MANIFEST_MAX + 1)
+        except OSError:
+            continue
+        found = (_declared_dependencies(name, raw)
+                 if len(raw) <= _MANIFEST_MAX else None)
+        if found is None:
+            head = raw[:_MANIFEST_HEAD].decode("utf-8", "replace").lower()
+            found = set(pattern.findall(head))
+        for framework in frameworks:
+            if framework in found:
+                return framework
+    return None
+
+
+def detect_context(cwd: str) -> tuple[str, str] | None:
+    """(search query, primary language) for the repo at cwd, or None.
+
+    The language comes back with the query so main() never walks the tree a
+    second time to recover it.
+    """
     cwd_path = Path(cwd)
     if not _in_git_repo(cwd_path):
         return None
@@ -598,33 +709,12 @@ def detect_context(cwd: str) -> str | None:
     if not extension_counts:
         return None
 
-    primary_ext = max(extension_counts, key=lambda e: extension_counts[e])
+    primary_ext = max(extension_counts, key=extension_counts.get)
     language = EXTENSION_TO_LANGUAGE.get(primary_ext, "")
     if not language:
         return None
 
-    framework: str | None = None
-    pyproject = cwd_path / "pyproject.toml"
-    if pyproject.exists():
-        try:
-            contents = pyproject.read_text(encoding="utf-8").lower()
-            for name in ("fastapi", "django", "flask"):
-                if name in contents:
-                    framework = name
-                    break
-        except OSError:
-            pass
-
-    package_json = cwd_path / "package.json"
-    if package_json.exists() and not framework:
-        try:
-            contents = package_json.read_text(encoding="utf-8").lower()
-            for name in ("next", "react", "express", "vue"):
-                if name in contents:
-                    framework = name
-                    break
-        except OSError:
-            pass
+    framework = _manifest_framework(cwd_path)
 
     if (cwd_path / "Cargo.toml").exists() and not framework:
         framework = "rust"
@@ -635,11 +725,82 @@ def detect_context(cwd: str) -> str | None:
     if framework and framework != language:
         parts.append(framework)
     parts.append("common patterns and solutions")
-    return " ".join(parts)
+    return " ".join(parts), language
+
+
+# Warm session starts in the same repo reuse the last detection (and its
+# search hits) instead of re-walking the tree and re-querying the API.
+_DETECTION_TTL = 3600
+_DETECTION_MANIFESTS = ("pyproject.toml", "package.json", "Cargo.toml", "go.mod")
+
+
+def _detection_cache_path() -> Path:
+    return CONFIG_DIR / "detection_cache.json"
+
+
+def _detection_key(cwd: str) -> list:
+    """Manifest mtimes: editing one changes framework detection, so it must
+    invalidate the cached entry (None for a manifest that doesn't exist)."""
+    key = []
+    for name in _DETECTION_MANIFESTS:
+        try:
+            key.append(os.stat(os.path.join(cwd, name)).st_mtime_ns)
+        except OSError:
+            key.append(None)
+    return key
+
+
+def _load_detection_cache() -> dict:
+    try:
+        cache = json.loads(_detection_cache_path().read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def cached_detection(cwd: str, key: list) -> dict | None:
+    """The fresh cache entry for cwd — query, language, results — or None."""
+    entry = _load_detection_cache().get(cwd)
+    if (isinstance(entry, dict) and entry.get("key") == key
+            and time.time() - entry.get("ts", 0) < _DETECTION_TTL):
+        return entry
+    return None
+
+
+def store_detection(cwd: str, key: list, query: str, language: str,
+                    results: list[dict]) -> None:
+    """Record this cwd's detection; expired entries are dropped. Never raises."""
+    import tempfile
+
+    now = time.time()
+    cache = {c: e for c, e in _load_detection_cache().items()
+             if isinstance(e, dict) and now - e.get("ts", 0) < _DETECTION_TTL}
+    cache[cwd] = {"key": key, "query": query, "language": language,
+                  "results": results, "ts": now}
+    try:
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        # Same temp-file + os.replace as save_config: two sessions starting
+        # at once must never leave a torn file behind.
+        fd, tmp_path = tempfile.mkstemp(dir=CONFIG_DIR)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(cache, fh)
+            os.replace(tmp_path, _detection_cache_path())
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    except OSError as e:
+        _log_swallowed("store_detection", e)
 
 
 def search_commontrace(query: str, language: str, api_key: str,
                        context: dict | None = None) -> list[dict]:
+    import urllib.error
+    import urllib.request
+
     base_url = os.environ.get("COMMONTRACE_API_BASE_URL", API_BASE).rstrip("/")
     body: dict = {"q": query, "tags": [language], "limit": 3}
     if context:
@@ -681,9 +842,8 @@ def count_pending_traces() -> int:
     try:
         for path in PENDING_DIR.glob("*.jsonl"):
             try:
-                for line in path.read_text(encoding="utf-8").splitlines():
-                    if line.strip():
-                        total += 1
+                with path.open(encoding="utf-8") as f:
+                    total += sum(1 for line in f if line.strip())
             except OSError:
                 continue
     except OSError:
@@ -705,8 +865,7 @@ def _compiled_drop(config):
     set when the session actually produces output, deferring the drop
     until the first context-emitting session of the month.
     """
-    import time as _time
-    t = _time.localtime()
+    t = time.localtime()
     current = f"{t.tm_year}-{t.tm_mon:02d}"
     if config.get("last_compiled_month") == current:
         return None
@@ -717,14 +876,9 @@ def _compiled_drop(config):
     text = None
     path = None
     try:
-        sys.path.insert(0, str(Path(__file__).parent))
         from artifacts import compiled_recap, write_artifact
-        from local_store import _get_conn
-        conn = _get_conn()
-        try:
-            text = compiled_recap(conn, year, month)
-        finally:
-            conn.close()
+        from local_store import get_conn
+        text = compiled_recap(get_conn(), year, month)
         if text:
             path = write_artifact(f"compiled-{year}-{month:02d}.txt", text)
     except Exception as e:
@@ -793,10 +947,34 @@ def _emit_setup_notice() -> None:
         }
     }))
 
+# How long main() waits on a background network call. Each has its own
+# urlopen timeout; this only bounds a stalled DNS lookup.
+_BACKGROUND_JOIN_TIMEOUT = 3.0
+
+
+def _in_background(fn, *args) -> tuple[threading.Thread, list]:
+    """Run fn(*args) on a daemon thread. Never raises.
+
+    Returns (thread, out): out receives fn's return value once it finishes
+    without raising, so an empty out after join() means no result.
+    """
+    out: list = []
+
+    def run():
+        try:
+            out.append(fn(*args))
+        except Exception:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, out
+
+
 def main() -> None:
     try:
         raw = sys.stdin.read()
-        data = json.loads(raw) if raw.strip() else {}
+        data = json.loads(raw) if raw and not raw.isspace() else {}
     except (json.JSONDecodeError, OSError):
         data = {}
 
@@ -807,50 +985,51 @@ def main() -> None:
         return
 
     # Step 1b: Daily DAU heartbeat (silent, rate-limited to 1/day locally)
-    try:
-        maybe_ping(api_key)
-    except Exception:
-        pass
-
     # Step 1c: Daily update check same cadence, appended to the session note.
-    update_note = ""
+    # Both are network calls that don't feed detection or the search, so
+    # they run alongside it instead of ahead of it.
+    ping = _in_background(maybe_ping, api_key)
+    update = _in_background(maybe_check_update, load_config())
     try:
-        update_note = maybe_check_update(config)
-    except Exception:
-        pass
+        _run_session_start(data, api_key, update)
+    finally:
+        # The heartbeat must land even when detection returns early.
+        ping[0].join(_BACKGROUND_JOIN_TIMEOUT)
 
+
+def _run_session_start(data: dict, api_key: str,
+                       update: tuple[threading.Thread, list]) -> None:
+    """main() after setup: detect, register, search, emit the context."""
     # Step 2: Detect coding context
     cwd = data.get("cwd", os.getcwd())
     if not cwd:
         return
 
-    query = detect_context(cwd)
-    if not query:
-        return
-
-    # Determine primary language (same bounded recursive scan as detect_context,
-    # so nested-source monorepos resolve a language instead of bailing here).
-    cwd_path = Path(cwd)
-    extension_counts = _scan_languages(cwd_path)
-    if not extension_counts:
-        return
-    primary_ext = max(extension_counts, key=lambda e: extension_counts[e])
-    language = EXTENSION_TO_LANGUAGE.get(primary_ext, "")
-    if not language:
-        return
+    detection_key = _detection_key(cwd)
+    warm = cached_detection(cwd, detection_key)
+    if warm:
+        query, language = warm["query"], warm["language"]
+    else:
+        detected = detect_context(cwd)
+        if not detected:
+            return
+        query, language = detected
 
     # Step 2b: Persistent local store register project + build context
     context_dict = None
-    session_id = data.get("session_id") or f"unknown-{uuid.uuid4().hex[:12]}"
+    session_id = data.get("session_id")
+    if not session_id:
+        import uuid
+        session_id = f"unknown-{uuid.uuid4().hex[:12]}"
     contribution_recall = ""
     savings_recap = ""
     try:
         import local_store
         from local_store import (
-            _get_conn, ensure_project, start_session, get_project_context,
+            get_conn, ensure_project, start_session, get_project_context_by_id,
             get_cached_traces, get_trigger_effectiveness,
         )
-        conn = _get_conn()
+        conn = get_conn()
         # Detect framework for the project record
         framework = None
         if query:
@@ -858,9 +1037,12 @@ def main() -> None:
                 if fw in query:
                     framework = fw
                     break
-        project_id = ensure_project(conn, cwd, language, framework)
-        start_session(conn, session_id, project_id)
-        context_dict = get_project_context(conn, cwd)
+        with local_store.batch(conn):
+            project_id = ensure_project(conn, cwd, language, framework)
+            start_session(conn, session_id, project_id)
+        # The upsert just returned the id — look up by primary key rather
+        # than re-resolving the path.
+        context_dict = get_project_context_by_id(conn, project_id)
 
         # Contribution recall surface previously useful traces
         cached = get_cached_traces(conn, project_id, limit=3)
@@ -897,8 +1079,6 @@ def main() -> None:
                     json.dumps(trigger_stats), encoding="utf-8")
         except OSError:
             pass
-
-        conn.close()
     except Exception as e:
         # Status-bearing: registers the project, opens the session, and writes
         # the context/savings bridge files off local.db. A swallowed failure
@@ -907,8 +1087,13 @@ def main() -> None:
         _log_swallowed("session_start_local_store", e)
         context_dict = None
 
-    # Step 3: Search CommonTrace (with context if available)
-    results = search_commontrace(query, language, api_key, context_dict)
+    # Step 3: Search CommonTrace (with context if available). A fresh cache
+    # entry's hits are reused; an empty one is retried, not kept.
+    results = warm.get("results") if warm else None
+    if not results:
+        results = search_commontrace(query, language, api_key, context_dict)
+        if results or not warm:
+            store_detection(cwd, detection_key, query, language, results)
 
     if results:
         formatted = [f"{i + 1}. {format_result(r)}" for i, r in enumerate(results)]
@@ -973,6 +1158,8 @@ def main() -> None:
     if savings_recap:
         additional_context += "\n\n" + savings_recap
 
+    update[0].join(_BACKGROUND_JOIN_TIMEOUT)
+    update_note = update[1][0] if update[1] else ""
     if update_note:
         additional_context += "\n\n" + update_note
 
@@ -13,9 +13,11 @@ Files:
   changes.jsonl     — files modified by Write/Edit/NotebookEdit
   research.jsonl    — WebSearch/WebFetch usage
   contributions.jsonl — traces contributed via MCP
-  user_turn_count   — plain integer, incremented per real user message
+  user_turn_count   — optional leading integer plus one "." appended
+                      (O_APPEND) per real user message; read as their sum
 """
 
+import atexit
 import hashlib
 import json
 import os
@@ -45,8 +47,7 @@ def log_hook_error(where: str, exc: BaseException) -> None:
     try:
         HOOK_ERROR_LOG.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
         try:
-            if (HOOK_ERROR_LOG.exists()
-                    and HOOK_ERROR_LOG.stat().st_size > _HOOK_ERROR_LOG_MAX_BYTES):
+            if HOOK_ERROR_LOG.stat().st_size > _HOOK_ERROR_LOG_MAX_BYTES:
                 HOOK_ERROR_LOG.write_text("", encoding="utf-8")
         except OSError:
             pass
@@ -101,6 +102,9 @@ CONFIG_NAME_FRAGMENTS = {
     "package.json", "tsconfig", "webpack", "vite", "babel",
     "eslint", "prettier", "pyproject", "setup.py", "setup.cfg",
 }
+# The fragments as one alternation: a single scan of the name per call.
+_CONFIG_FRAGMENT_RE = re.compile(
+    "|".join(map(re.escape, sorted(CONFIG_NAME_FRAGMENTS))))
 
 
 def get_state_dir(data: dict) -> Path:
@@ -113,85 +117,299 @@ def get_state_dir(data: dict) -> Path:
     d = STATE_ROOT / session_id
     # H9: Create with restrictive permissions (owner-only)
     d.mkdir(parents=True, exist_ok=True, mode=0o700)
-    # Ensure parent dir is also restrictive
-    if STATE_ROOT.exists():
-        try:
-            os.chmod(STATE_ROOT, 0o700)
-        except OSError:
-            pass
+    # Ensure parent dir is also restrictive (it exists: mkdir just made d)
+    try:
+        os.chmod(STATE_ROOT, 0o700)
+    except OSError:
+        pass
     return d
 
 
+def _append_raw(path: Path, data: bytes) -> None:
+    """Append bytes with one O_APPEND write — no buffered file object.
+
+    O_APPEND makes the kernel seek-and-write atomically, so whole lines from
+    concurrent hook processes never interleave mid-line. Raises OSError.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Event lines are machine-read only: a prebuilt compact encoder skips
+# json.dumps' per-call argument handling and writes no padding spaces.
+_encode_event = json.JSONEncoder(separators=(",", ":")).encode
+
+
 def append_event(state_dir: Path, filename: str, entry: dict) -> None:
     """Append a JSON event to a JSONL state file."""
     entry.setdefault("t", time.time())
     try:
-        with open(state_dir / filename, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        _append_raw(state_dir / filename,
+                    (_encode_event(entry) + "\n").encode("utf-8"))
     except OSError:
         pass
 
 
+# Events queued by queue_event(), keyed by target JSONL path, written by
+# flush_events(). Lines are serialized at queue time, so later mutation of
+# the entry dict can't change what lands on disk.
+_pending: dict[Path, list[str]] = {}
+
+
+def queue_event(state_dir: Path, filename: str, entry: dict) -> None:
+    """Like append_event, but buffered until flush_events().
+
+    A PostToolUse run can write to several JSONL files; queueing turns one
+    open/write/close per event into one per file. read_events() sees queued
+    events, so readers in the same process stay consistent.
+    """
+    entry.setdefault("t", time.time())
+    _pending.setdefault(state_dir / filename, []).append(_encode_event(entry) + "\n")
+
+
+def flush_events() -> None:
+    """Write every queued event — one append per target file. Never raises."""
+    while _pending:
+        path, lines = _pending.popitem()
+        try:
+            _append_raw(path, "".join(lines).encode("utf-8"))
+        except OSError:
+            pass
+
+
+# main() flushes explicitly; this catches a hook that queues and then exits
+# by another route, so queued events are never silently dropped.
+atexit.register(flush_events)
+
+
+def has_events(state_dir: Path, filename: str) -> bool:
+    """True if the JSONL file is non-empty or has queued events. One stat."""
+    path = state_dir / filename
+    if path in _pending:
+        return True
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+
 def read_events(state_dir: Path, filename: str) -> list[dict]:
-    """Read all events from a JSONL state file."""
+    """Read all events from a JSONL state file, plus any still queued."""
+    entries = []
+    try:
+        # Stream line by line: memory stays O(line), not O(file) + a list
+        # of every line. A missing file is just an empty stream.
+        with open(state_dir / filename, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    except OSError:
+        pass
+    for line in _pending.get(state_dir / filename, ()):
+        entries.append(json.loads(line))
+    return entries
+
+
+_TAIL_BLOCK = 8192
+
+
+def read_last_event(state_dir: Path, filename: str) -> dict | None:
+    """The newest event in a JSONL state file, without parsing the rest.
+
+    Reads only the final block of the file; a last line longer than that
+    falls back to a full read. Queued events are newer than anything on disk.
+    """
+    pending = _pending.get(state_dir / filename)
+    if pending:
+        return json.loads(pending[-1])
     try:
-        path = state_dir / filename
-        if not path.exists():
-            return []
-        entries = []
-        for line in path.read_text(encoding="utf-8").strip().split("\n"):
-            if line.strip():
-                try:
-                    entries.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-        return entries
+        with open(state_dir / filename, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(size - _TAIL_BLOCK, 0)
+            f.seek(start)
+            lines = f.read().split(b"\n")
     except OSError:
-        return []
+        return None
+    # With start > 0 the first piece is a partial line; never parse it.
+    for line in reversed(lines[1:] if start else lines):
+        if line.strip():
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                continue
+    if start:
+        events = read_events(state_dir, filename)
+        return events[-1] if events else None
+    return None
+
+
+class EventCache:
+    """read_events() memoized for one hook invocation.
+
+    Several detectors read the same JSONL files; each file is parsed at most
+    once per EventCache. append() queues through queue_event(), so the write
+    joins the invocation's single flush and later reads still see it.
+    """
+
+    def __init__(self, state_dir: Path):
+        self.state_dir = state_dir
+        self._events: dict[str, list[dict]] = {}
+
+    def get(self, filename: str) -> list[dict]:
+        events = self._events.get(filename)
+        if events is None:
+            events = self._events[filename] = read_events(self.state_dir, filename)
+        return events
+
+    def has(self, filename: str) -> bool:
+        events = self._events.get(filename)
+        if events is not None:
+            return bool(events)
+        return has_events(self.state_dir, filename)
+
+    def last(self, filename: str) -> dict | None:
+        """The newest event — from the parsed list if loaded, else the tail."""
+        events = self._events.get(filename)
+        if events is not None:
+            return events[-1] if events else None
+        return read_last_event(self.state_dir, filename)
+
+    def append(self, filename: str, entry: dict) -> None:
+        queue_event(self.state_dir, filename, entry)
+        if filename in self._events:
+            self._events[filename].append(entry)
 
 
 def read_counter(state_dir: Path, filename: str) -> int:
-    """Read a simple integer counter."""
+    """Read a simple integer counter.
+
+    Either an integer written whole (write_text of a count) or a tally of
+    b"." bytes from increment_counter — or both: an integer a session
+    started with, then dots appended after it.
+    """
     try:
-        path = state_dir / filename
-        if not path.exists():
-            return 0
-        return int(path.read_text(encoding="utf-8").strip())
-    except (ValueError, OSError):
+        data = (state_dir / filename).read_bytes()
+    except OSError:
+        return 0
+    base = data.rstrip(b".")
+    try:
+        start = int(base) if base.strip() else 0
+    except ValueError:
         return 0
+    return start + len(data) - len(base)
 
 
 def increment_counter(state_dir: Path, filename: str) -> int:
-    """Increment and return a simple integer counter."""
-    count = read_counter(state_dir, filename) + 1
+    """Increment and return a simple integer counter.
+
+    One O_APPEND byte per increment: concurrent hooks can't lose each
+    other's update the way read-modify-write of the number could.
+    """
     try:
-        (state_dir / filename).write_text(str(count), encoding="utf-8")
+        _append_raw(state_dir / filename, b".")
     except OSError:
-        pass
-    return count
+        return read_counter(state_dir, filename) + 1
+    return read_counter(state_dir, filename)
+
+
+# Bridge-file values already read this process, keyed by state dir.
+# session_start writes these files once, before any other hook runs, so a
+# value seen once stays valid; misses are not memoized (the file may appear).
+_project_ids: dict[Path, int] = {}
+_fingerprints: dict[Path, dict] = {}
+_trigger_stats: dict[Path, dict] = {}
 
 
 def read_project_id(state_dir: Path) -> int | None:
     """Read the project_id bridge file written by session_start."""
+    pid = _project_ids.get(state_dir)
+    if pid is not None:
+        return pid
     try:
-        return int((state_dir / "project_id").read_text(
+        pid = int((state_dir / "project_id").read_text(
             encoding="utf-8").strip())
     except (ValueError, OSError):
         return None
+    _project_ids[state_dir] = pid
+    return pid
 
 
 def read_context_fingerprint(state_dir: Path) -> dict | None:
     """Read the context fingerprint bridge file written by session_start."""
+    fp = _fingerprints.get(state_dir)
+    if fp is not None:
+        return dict(fp)
+    try:
+        fp = json.loads((state_dir / "context_fingerprint.json").read_text(
+            encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return None
+    if isinstance(fp, dict):
+        _fingerprints[state_dir] = fp
+        return dict(fp)
+    return fp
+
+
+def read_trigger_stats(state_dir: Path) -> dict | None:
+    """Read the trigger_stats.json bridge file written by session_start.
+
+    Every adaptive cooldown in a hook run consults it; the parse is shared.
+    The returned dict is cached — callers must not mutate it.
+    """
+    stats = _trigger_stats.get(state_dir)
+    if stats is not None:
+        return stats
     try:
-        return json.loads((state_dir / "context_fingerprint.json").read_text(
+        stats = json.loads((state_dir / "trigger_stats.json").read_text(
             encoding="utf-8"))
     except (json.JSONDecodeError, OSError):
         return None
+    if not isinstance(stats, dict):
+        return None
+    _trigger_stats[state_dir] = stats
+    return stats
 
 
 def error_hash(text: str) -> str:
-    """Short hash for deduplicating errors."""
-    return hashlib.sha256(text[:300].encode()).hexdigest()[:10]
+    """Short hash for deduplicating errors.
+
+    Not a security digest: blake2b sized to the 10 hex chars we keep,
+    rather than a full sha256 cut down after the fact.
+    """
+    return hashlib.blake2b(text[:300].encode("utf-8", "replace"),
+                           digest_size=5).hexdigest()
+
+
+# error_signature's normalizations, compiled once and applied in order.
+_SIGNATURE_SUBS = (
+    # Strip file paths (keep only basename)
+    (re.compile(r'(?:/[\w.-]+)+/([\w.-]+)'), r'\1'),
+    # Windows paths
+    (re.compile(r'(?:[A-Z]:\\[\w.-]+\\)+([\w.-]+)'), r'\1'),
+    # Line/column numbers
+    (re.compile(r'(?:line|ln|l)\s*\d+', re.IGNORECASE), 'line N'),
+    (re.compile(r':\d+:\d+'), ':N:N'),
+    (re.compile(r':\d+'), ':N'),
+    # Hex addresses
+    (re.compile(r'0x[0-9a-fA-F]+'), '0xADDR'),
+    # UUIDs
+    (re.compile(
+        r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}',
+        re.IGNORECASE), 'UUID'),
+    # Timestamps (ISO, epoch-like)
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}[\w:.]*'), 'TIMESTAMP'),
+    (re.compile(r'\b\d{10,13}\b'), 'EPOCH'),
+    # Collapse whitespace
+    (re.compile(r'\s+'), ' '),
+)
 
 
 def error_signature(text: str) -> str:
@@ -203,39 +421,15 @@ def error_signature(text: str) -> str:
     fuzzy matching — the same exception at different line numbers or
     in different files will match.
     """
-    import re
     sig = text[:500]
-    # Strip file paths (keep only basename)
-    sig = re.sub(r'(?:/[\w.-]+)+/([\w.-]+)', r'\1', sig)
-    # Windows paths
-    sig = re.sub(r'(?:[A-Z]:\\[\w.-]+\\)+([\w.-]+)', r'\1', sig)
-    # Line/column numbers
-    sig = re.sub(r'(?:line|ln|l)\s*\d+', 'line N', sig, flags=re.IGNORECASE)
-    sig = re.sub(r':\d+:\d+', ':N:N', sig)
-    sig = re.sub(r':\d+', ':N', sig)
-    # Hex addresses
-    sig = re.sub(r'0x[0-9a-fA-F]+', '0xADDR', sig)
-    # UUIDs
-    sig = re.sub(
-        r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}',
-        'UUID', sig, flags=re.IGNORECASE)
-    # Timestamps (ISO, epoch-like)
-    sig = re.sub(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}[\w:.]*', 'TIMESTAMP', sig)
-    sig = re.sub(r'\b\d{10,13}\b', 'EPOCH', sig)
-    # Collapse whitespace
-    sig = re.sub(r'\s+', ' ', sig).strip()
-    return sig
+    for pattern, repl in _SIGNATURE_SUBS:
+        sig = pattern.sub(repl, sig)
+    return sig.strip()
 
 
-def is_config_file(file_path: str) -> bool:
+def is_config_file(file_path: str | Path) -> bool:
     """Check if a file path looks like a configuration file."""
     p = Path(file_path)
-    name_lower = p.name.lower()
-    suffix_lower = p.suffix.lower()
-
-    if suffix_lower in CONFIG_EXTENSIONS:
+    if p.suffix.lower() in CONFIG_EXTENSIONS:
         return True
-    for fragment in CONFIG_NAME_FRAGMENTS:
-        if fragment in name_lower:
-            return True
-    return False
+    return _CONFIG_FRAGMENT_RE.search(p.name.lower()) is not None
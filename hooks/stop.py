@@ -36,14 +36,17 @@ sys.path.insert(0, str(Path(__file__).parent))
 try:
     import ct_config
     from candidate import _build_candidate, _contribution_directive
-    from scoring import IMPORTANCE_THRESHOLD, compute_importance
+    from scoring import (
+        IMPORTANCE_THRESHOLD, can_reach_threshold, compute_importance,
+    )
     from session_report import _book_savings, _persist_session, _report_trigger_stats
-    from session_state import get_state_dir, read_events, read_counter, log_hook_error
+    from session_state import (
+        EventCache, get_state_dir, read_counter, read_project_id, log_hook_error,
+    )
 except ImportError:
     sys.exit(0)
 
 
-RESOLUTION_DIR = Path.home() / ".commontrace" / "resolutions"
 PENDING_DIR = Path.home() / ".commontrace" / "pending"
 
 
@@ -71,7 +74,7 @@ def _write_pending(session_key: str, payload: dict) -> None:
         log_hook_error("write_pending", e)
 
 
-def _struggle_artifact(candidate, state_dir, trace_id=""):
+def _struggle_artifact(candidate, state_dir, trace_id="", events=None):
     """Write the Wordle-style struggle line for this session's knowledge.
 
     Aggregate shape only — built from event timestamps and counts, never
@@ -80,8 +83,9 @@ def _struggle_artifact(candidate, state_dir, trace_id=""):
     """
     try:
         from artifacts import struggle_grid, struggle_line, write_artifact
-        errors = read_events(state_dir, "errors.jsonl")
-        changes = read_events(state_dir, "changes.jsonl")
+        events = events or EventCache(state_dir)
+        errors = events.get("errors.jsonl")
+        changes = events.get("changes.jsonl")
         meta = candidate.get("metadata_json") or {}
         grid = struggle_grid([e.get("t", 0) for e in errors],
                              [c.get("t", 0) for c in changes], resolved=True)
@@ -101,31 +105,35 @@ def get_session_key(data: dict) -> str:
     return str(session_id) if session_id else str(os.getppid())
 
 
-def _marker_path(session_key: str, kind: str, sub: str = "") -> Path:
-    name = f"prompted-{kind}-{session_key}"
-    if sub:
-        name += f"-{sub}"
-    return RESOLUTION_DIR / name
+def _dedup_key(kind: str, sub: str = "") -> str:
+    return f"{kind}-{sub}" if sub else kind
 
 
 def already_prompted(session_key: str, kind: str, sub: str = "") -> bool:
     """One prompt per (session, kind, sub). Prevents re-nagging across turns
     as score bumps or turns_since increment."""
-    return _marker_path(session_key, kind, sub).exists()
+    try:
+        from local_store import get_conn, was_prompted
+        return was_prompted(get_conn(), session_key, _dedup_key(kind, sub))
+    except Exception as e:
+        # An unreadable store must not turn one ask per session into one
+        # per turn: report the prompt as already made.
+        log_hook_error("prompt_dedup", e)
+        return True
 
 
 def mark_prompted(session_key: str, kind: str, sub: str = "") -> None:
-    RESOLUTION_DIR.mkdir(parents=True, exist_ok=True)
     try:
-        _marker_path(session_key, kind, sub).write_text("1", encoding="utf-8")
-    except OSError:
-        pass
+        from local_store import get_conn, record_prompted
+        record_prompted(get_conn(), session_key, _dedup_key(kind, sub))
+    except Exception as e:
+        log_hook_error("prompt_dedup", e)
 
 
 def main() -> None:
     try:
         raw = sys.stdin.read()
-        data = json.loads(raw) if raw.strip() else {}
+        data = json.loads(raw) if raw and not raw.isspace() else {}
     except (json.JSONDecodeError, OSError):
         data = {}
 
@@ -134,27 +142,22 @@ def main() -> None:
 
     session_key = get_session_key(data)
     state_dir = get_state_dir(data)
+    # Every step below reads the same JSONL files; parse each one once.
+    events = EventCache(state_dir)
 
     # Persist session data to SQLite
-    _persist_session(data, state_dir)
+    _persist_session(data, state_dir, events)
 
     # Book measured-inbound savings (best-effort; never crashes the hook)
-    _book_savings(data, state_dir)
+    _book_savings(data, state_dir, events)
 
     # Report trigger stats (best-effort)
-    _report_trigger_stats(data, state_dir)
+    _report_trigger_stats(data, state_dir, events)
 
     # Check for post-contribution refinement first
-    contributions = read_events(state_dir, "contributions.jsonl")
+    contributions = events.get("contributions.jsonl")
     user_turns = read_counter(state_dir, "user_turn_count")
-    turns_at_contribution = 0
-    try:
-        path = state_dir / "user_turns_at_contribution"
-        if path.exists():
-            turns_at_contribution = int(
-                path.read_text(encoding="utf-8").strip())
-    except (ValueError, OSError):
-        pass
+    turns_at_contribution = read_counter(state_dir, "user_turns_at_contribution")
 
     # auto_contribute (default False): contribute silently vs. ask the user.
     auto_mode = ct_config.read_config().get("auto_contribute", False)
@@ -180,22 +183,23 @@ def main() -> None:
             })
             return
 
+    # Most sessions can't reach the threshold — settle that before paying
+    # for the effectiveness query and a second scoring pass.
+    if not can_reach_threshold(events):
+        return
+
     # Compute importance score
     effectiveness = None
     try:
-        from local_store import _get_conn, get_trigger_effectiveness
-        pid_path = state_dir / "project_id"
-        if pid_path.exists():
-            project_id = int(pid_path.read_text(encoding="utf-8").strip())
-            conn = _get_conn()
-            try:
-                effectiveness = get_trigger_effectiveness(conn, project_id)
-            finally:
-                conn.close()
+        from local_store import get_conn, get_trigger_effectiveness
+        project_id = read_project_id(state_dir)
+        if project_id is not None:
+            effectiveness = get_trigger_effectiveness(get_conn(), project_id)
     except Exception as e:
         log_hook_error("reinforcement_effectiveness", e)
         effectiveness = None
-    score, top_pattern, top_evidence = compute_importance(state_dir, effectiveness)
+    score, top_pattern, top_evidence = compute_importance(
+        state_dir, effectiveness, events)
 
     if score < IMPORTANCE_THRESHOLD:
         return
@@ -204,8 +208,10 @@ def main() -> None:
         return
 
     mark_prompted(session_key, "score")
-    candidate = _build_candidate(score, top_pattern, top_evidence, state_dir, transcript_path=data.get("transcript_path", ""))
-    _struggle_artifact(candidate, state_dir)
+    candidate = _build_candidate(score, top_pattern, top_evidence, state_dir,
+                                 transcript_path=data.get("transcript_path", ""),
+                                 events=events)
+    _struggle_artifact(candidate, state_dir, events=events)
 
     # Hand the candidate to the agent to author REAL content. The hook can only
     # synthesize the mechanical journey template (a husk) — no LLM in hooks — so
@@ -222,7 +228,7 @@ def main() -> None:
 
     # Fallback (directive build failed): keep the durable pending record so
     # nothing is lost and /trace can still surface it.
-    line = _struggle_artifact(candidate, state_dir)
+    line = _struggle_artifact(candidate, state_dir, events=events)
     _write_pending(session_key, {
         "kind": "score",
         "session_id": data.get("session_id", ""),
@@ -120,8 +120,7 @@ _AUTO_CONTRIBUTE_DIRECTIVE = (
 def _read_config() -> dict:
     """Read ~/.commontrace/config.json. Returns {} on any failure."""
     try:
-        if CONFIG_FILE.exists():
-            return json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+        return json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
     except (json.JSONDecodeError, OSError):
         pass
     return {}
@@ -192,7 +191,7 @@ def _maybe_auto_contribute_directive(state_dir: Path, prompt: str):
 def main() -> None:
     try:
         raw = sys.stdin.read()
-        data = json.loads(raw) if raw.strip() else {}
+        data = json.loads(raw) if raw and not raw.isspace() else {}
     except (json.JSONDecodeError, OSError):
         return
 
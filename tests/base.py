@@ -1,11 +1,12 @@
 """Shared test base: isolates every test from the real ~/.commontrace.
 
-Patches the module-level path constants in artifacts, local_store, and
-ct_config so tests never touch the developer's real local.db, cooldowns, or
-config, and never make network calls (no API key resolvable).
+Patches the module-level path constants in artifacts, local_store,
+ct_config and session_state so tests never touch the developer's real
+local.db, cooldowns, config or hook-errors.log, and never make network calls
+(no API key resolvable).
 
-ct_config owns CONFIG_FILE and COOLDOWN_DIR for the whole hook suite, so
-one patch here covers every module that reads them.
+ct_config owns CONFIG_FILE, COOLDOWN_DIR and SEARCH_CACHE_DIR for the whole
+hook suite, so one patch here covers every module that reads them.
 """
 
 import os
@@ -25,6 +26,7 @@ import local_store  # noqa: E402
 import post_tool_use  # noqa: E402
 import resolution  # noqa: E402,F401
 import retrieval  # noqa: E402,F401
+import session_state  # noqa: E402
 from session_state import append_event, read_events  # noqa: E402,F401
 
 
@@ -40,11 +42,20 @@ class HookTestCase(unittest.TestCase):
             (artifacts, "ARTIFACTS_DIR", self.tmp_path / "artifacts"),
             (local_store, "DB_PATH", self.tmp_path / "local.db"),
             (ct_config, "COOLDOWN_DIR", self.tmp_path / "cooldowns"),
+            (ct_config, "SEARCH_CACHE_DIR", self.tmp_path / "search_cache"),
             (ct_config, "CONFIG_FILE", self.tmp_path / "no-config.json"),
+            (session_state, "HOOK_ERROR_LOG", self.tmp_path / "hook-errors.log"),
         ]:
             patcher = mock.patch.object(target, attr, value)
             patcher.start()
             self.addCleanup(patcher.stop)
+        # Drop any cached connection before the temp database goes away.
+        self.addCleanup(local_store.close_conn)
+        # Handlers called directly (not via main) leave events queued.
+        self.addCleanup(session_state._pending.clear)
+        self.addCleanup(session_state._project_ids.clear)
+        self.addCleanup(session_state._fingerprints.clear)
+        self.addCleanup(session_state._trigger_stats.clear)
 
         # Offline guarantee: no API key from the environment either.
         env_patcher = mock.patch.dict(os.environ)
@@ -1,6 +1,8 @@
 """Adaptive cooldown: suppression must read real stats and never be permanent."""
 
 import json
+import os
+import time
 import unittest
 
 from tests.base import HookTestCase, retrieval
@@ -49,5 +51,22 @@ class TestAdaptiveCooldown(HookTestCase):
                 "bash_error", 30, self.state_dir), 30)
 
 
+class TestCooldownMarker(HookTestCase):
+    def test_set_then_expire(self):
+        self.assertFalse(retrieval.is_on_cooldown("pre_code", 60))
+        retrieval.set_cooldown("pre_code")
+        self.assertTrue(retrieval.is_on_cooldown("pre_code", 60))
+        marker = retrieval._cooldown_dir() / "pre_code.ts"
+        old = time.time() - 120
+        os.utime(marker, (old, old))
+        self.assertFalse(retrieval.is_on_cooldown("pre_code", 60))
+
+    def test_legacy_float_marker_still_honoured(self):
+        retrieval._cooldown_dir().mkdir(parents=True)
+        (retrieval._cooldown_dir() / "bash_error.ts").write_text(
+            str(time.time()), encoding="utf-8")
+        self.assertTrue(retrieval.is_on_cooldown("bash_error", 60))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -191,5 +191,20 @@ def _child_ensure_setup(q):
         q.put(session_start.ensure_setup())
 
 
+class TestReadConfigCache(HookTestCase):
+    def test_external_rewrite_is_seen(self):
+        ct_config.write_config({"api_key": "first"})
+        self.assertEqual(ct_config.load_api_key(), "first")
+        # Another hook process rewrites the file behind our back.
+        ct_config.CONFIG_FILE.write_text(
+            json.dumps({"api_key": "second-longer"}), encoding="utf-8")
+        self.assertEqual(ct_config.load_api_key(), "second-longer")
+
+    def test_returns_independent_copies(self):
+        ct_config.write_config({"telemetry": False})
+        ct_config.read_config()["telemetry"] = True
+        self.assertFalse(ct_config.read_config()["telemetry"])
+
+
 if __name__ == "__main__":
     unittest.main()
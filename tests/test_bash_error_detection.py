@@ -184,5 +184,84 @@ class PostTurnRevisionDocsExclusion(HookTestCase):
         self.assertIn("post_turn_revision", patterns)
 
 
+class TestFixCycleDetection(HookTestCase):
+    """A test command matched as whole words anywhere in the command."""
+
+    def _run(self, command):
+        post_tool_use._detect_knowledge_candidates(
+            "Bash",
+            {"tool_name": "Bash", "tool_input": {"command": command},
+             "tool_response": {"stdout": "ok", "exitCode": 0}},
+            self.state_dir)
+        return {c.get("pattern") for c in
+                read_events(self.state_dir, "candidates.jsonl")}
+
+    def setUp(self):
+        super().setUp()
+        append_event(self.state_dir, "errors.jsonl",
+                     {"command": "cd app && npm run test -- --ci"})
+        append_event(self.state_dir, "changes.jsonl",
+                     {"tool": "Edit", "file": "/repo/src/app.js"})
+
+    def test_passing_test_run_after_failure_is_a_cycle(self):
+        self.assertIn("test_fix_cycle", self._run("python -m pytest -q"))
+
+    def test_non_test_command_is_not(self):
+        self.assertNotIn("test_fix_cycle", self._run("npm run build"))
+
+    def test_test_command_must_be_a_whole_word(self):
+        self.assertNotIn("test_fix_cycle", self._run("cat docs/jesting.md"))
+        self.assertIn("test_fix_cycle", self._run("cargo  test --lib"))
+        self.assertIn("test_fix_cycle", self._run("pnpm test"))
+        self.assertIn("test_fix_cycle", self._run("pnpm run test -- --watch=false"))
+
+
+class LargeOutputIsBounded(unittest.TestCase):
+    def test_huge_stderr_keeps_head_and_tail_only(self):
+        stderr = ("HEAD-LINE\n" + "x" * 5_000_000
+                  + "\nTypeError: boom at the end")
+        is_error, out, err = post_tool_use.detect_bash_error(
+            _resp(exit_code=1, output="o" * 1_000_000, stderr=stderr))
+        self.assertTrue(is_error)
+        self.assertEqual(len(out), 200)
+        self.assertLess(len(err), 3000)
+        self.assertTrue(err.startswith("HEAD-LINE"))
+        self.assertTrue(err.endswith("TypeError: boom at the end"))
+
+    def test_noise_line_across_either_cut_is_dropped(self):
+        noise = "\nShell cwd was reset to /home/alice/secret-project\n"
+        for stderr in ("x" * 1980 + noise + "y" * 3000,   # crosses the head cut
+                       "x" * 3000 + noise + "y" * 380):   # crosses the tail cut
+            _i, _o, err = post_tool_use.detect_bash_error(
+                _resp(exit_code=1, stderr=stderr))
+            self.assertNotIn("secret-project", err)
+            self.assertNotIn("alice", err)
+
+    def test_noise_lines_do_not_change_the_signature(self):
+        # Enough noise to fill the 2000-char head: bounded before stripping,
+        # the signature was built from what little survived plus the tail.
+        body = "TypeError: boom\n" + "  at frame\n" * 400
+        noisy = ("TypeError: boom\n" + "Shell cwd was reset to /tmp/x\n" * 80
+                 + body[len("TypeError: boom\n"):])
+        sigs = []
+        for stderr in (body, noisy):
+            _i, _o, err = post_tool_use.detect_bash_error(
+                _resp(exit_code=1, stderr=stderr))
+            sigs.append(post_tool_use.error_signature(
+                post_tool_use.redact_text(err[:2000])))
+        self.assertEqual(sigs[0], sigs[1])
+
+    def test_marker_scan_reads_only_the_tail(self):
+        # A green run's early log line is past the scan window; a failure
+        # summary at the end of the same log is inside it.
+        log = "Error: retrying fetch\n" + "ok\n" * 100_000
+        is_error, _o, _e = post_tool_use.detect_bash_error(
+            _resp(exit_code=0, output=log))
+        self.assertFalse(is_error)
+        is_error, _o, _e = post_tool_use.detect_bash_error(
+            _resp(exit_code=0, output=log + "Tests: 1 failed, 9 passed"))
+        self.assertTrue(is_error)
+
+
 if __name__ == "__main__":
     unittest.main()
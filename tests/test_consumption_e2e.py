@@ -162,5 +162,23 @@ def local_store_ensure(conn):
     return local_store.ensure_project(conn, "/test-project")
 
 
+class TestContributionTraceId(HookTestCase):
+    def _contribute(self, tool_response):
+        post_tool_use.handle_contribution(
+            {"tool_response": tool_response, "tool_input": {}}, self.state_dir)
+        return read_events(self.state_dir, "contributions.jsonl")[-1]["trace_id"]
+
+    def test_trace_id_taken_from_response_text(self):
+        tid = "3f2b8c1d-0a4e-4b6f-9c7d-1e2f3a4b5c6d"
+        self.assertEqual(self._contribute(
+            f"Trace created. id={tid} (pending review)"), tid)
+        self.assertEqual(self._contribute({"id": tid, "status": "ok"}), tid)
+
+    def test_near_miss_shapes_are_not_ids(self):
+        self.assertEqual(self._contribute(
+            "3f2b8c1d-0a4e-4b6f-9c7d-1e2f3a4b5c6 and ZZZZZZZZ-0a4e-4b6f-9c7d-"
+            "1e2f3a4b5c6d"), "")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,12 +6,14 @@ for the auto-contribute jam and what makes a contribution visible in full-auto.
 
 import sys
 import unittest
+from unittest import mock
 from pathlib import Path
 
 HOOKS_DIR = Path(__file__).resolve().parent.parent / "hooks"
 sys.path.insert(0, str(HOOKS_DIR))
 
 import stop  # noqa: E402
+from tests.base import HookTestCase, session_state  # noqa: E402
 
 CAND = {
     "title": "Gandi DNS: use DNS-01 not HTTP-01",
@@ -70,5 +72,26 @@ class ContributionDirectiveTests(unittest.TestCase):
             self.assertNotIn("invitations/redeem", d)
 
 
+class PromptDedupTests(HookTestCase):
+    def test_prompt_fires_once_per_session_and_key(self):
+        self.assertFalse(stop.already_prompted("s1", "amend", "t1"))
+        stop.mark_prompted("s1", "amend", "t1")
+        stop.mark_prompted("s1", "amend", "t1")
+        self.assertTrue(stop.already_prompted("s1", "amend", "t1"))
+        self.assertFalse(stop.already_prompted("s1", "amend", "t2"))
+        self.assertFalse(stop.already_prompted("s2", "amend", "t1"))
+        rows = self.get_conn().execute(
+            "SELECT COUNT(*) FROM prompt_dedup").fetchone()[0]
+        self.assertEqual(rows, 1)
+
+    def test_unreadable_store_suppresses_the_prompt(self):
+        with mock.patch("local_store.get_conn",
+                        side_effect=OSError("locked")):
+            self.assertTrue(stop.already_prompted("s1", "score"))
+        # Logged to HookTestCase's temp error log, not the real home.
+        self.assertIn("[prompt_dedup]",
+                      session_state.HOOK_ERROR_LOG.read_text(encoding="utf-8"))
+
+
 if __name__ == "__main__":
     unittest.main()
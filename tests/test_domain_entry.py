@@ -12,9 +12,11 @@ used to feed was retired in v1.5. Its observable is the trigger_feedback
 row, which is also what the adaptive cooldown reads back.
 """
 
+import json
 import unittest
+from unittest import mock
 
-from tests.base import HookTestCase, local_store, retrieval
+from tests.base import HookTestCase, ct_config, local_store, retrieval
 
 
 class TestDomainEntry(HookTestCase):
@@ -57,6 +59,26 @@ class TestDomainEntry(HookTestCase):
         self.assertIsNone(out)
         self.assertIsNone(self._fired())
 
+    def _write_fingerprint(self, ctx):
+        (self.state_dir / "context_fingerprint.json").write_text(
+            json.dumps(ctx), encoding="utf-8")
+
+    def test_language_comes_from_the_fingerprint_bridge(self):
+        pid = self._register(path="/proj", language="python")
+        self._write_fingerprint({"project_id": pid, "language": "rust"})
+        retrieval._check_domain_entry("/proj/src/foo.rs", self.state_dir)
+        self.assertIsNone(self._fired())
+
+    def test_search_carries_the_session_context(self):
+        pid = self._register(path="/proj", language="python")
+        ctx = {"project_id": pid, "language": "python", "session_count": 1}
+        self._write_fingerprint(ctx)
+        with mock.patch.object(ct_config, "load_api_key", return_value="k"), \
+             mock.patch.object(retrieval, "search_commontrace",
+                               return_value=[]) as search:
+            retrieval._check_domain_entry("/proj/src/foo.rs", self.state_dir)
+        self.assertEqual(search.call_args.args[2], ctx)
+
 
 if __name__ == "__main__":
     unittest.main()
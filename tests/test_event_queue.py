@@ -0,0 +1,116 @@
+"""queue_event/flush_events: buffered JSONL appends for PostToolUse.
+
+Handlers queue their events and main() writes them once per file on the way
+out. Readers in the same process must still see queued events, and nothing
+may be written until the flush.
+"""
+
+import unittest
+from collections import Counter
+from unittest import mock
+
+from tests.base import HookTestCase, read_events, session_state
+
+
+class EventQueueTests(HookTestCase):
+    def test_queued_events_visible_before_flush(self):
+        session_state.queue_event(self.state_dir, "errors.jsonl", {"n": 1})
+        self.assertFalse((self.state_dir / "errors.jsonl").exists())
+        self.assertEqual([e["n"] for e in read_events(
+            self.state_dir, "errors.jsonl")], [1])
+
+    def test_flush_appends_after_existing_lines(self):
+        session_state.append_event(self.state_dir, "errors.jsonl", {"n": 1})
+        session_state.queue_event(self.state_dir, "errors.jsonl", {"n": 2})
+        session_state.queue_event(self.state_dir, "errors.jsonl", {"n": 3})
+        session_state.queue_event(self.state_dir, "changes.jsonl", {"n": 4})
+        session_state.flush_events()
+        self.assertEqual(session_state._pending, {})
+        self.assertEqual([e["n"] for e in read_events(
+            self.state_dir, "errors.jsonl")], [1, 2, 3])
+        self.assertEqual(len(read_events(self.state_dir, "changes.jsonl")), 1)
+
+    def test_flush_swallows_missing_directory(self):
+        session_state.queue_event(self.tmp_path / "gone", "errors.jsonl", {})
+        session_state.flush_events()
+        self.assertEqual(session_state._pending, {})
+
+
+class EventCacheTests(HookTestCase):
+    def test_parses_each_file_once_and_queues_appends(self):
+        session_state.append_event(self.state_dir, "candidates.jsonl", {"n": 1})
+        events = session_state.EventCache(self.state_dir)
+        first = events.get("candidates.jsonl")
+        self.assertIs(events.get("candidates.jsonl"), first)
+        events.append("candidates.jsonl", {"n": 2})
+        self.assertIn(self.state_dir / "candidates.jsonl", session_state._pending)
+        self.assertEqual([e["n"] for e in events.get("candidates.jsonl")], [1, 2])
+        self.assertEqual([e["n"] for e in read_events(
+            self.state_dir, "candidates.jsonl")], [1, 2])
+
+    def test_last_reads_only_the_tail(self):
+        for n in range(2000):
+            session_state.append_event(self.state_dir, "user_turns.jsonl",
+                                       {"n": n, "pad": "x" * 20})
+        self.assertEqual(session_state.read_last_event(
+            self.state_dir, "user_turns.jsonl")["n"], 1999)
+        session_state.queue_event(self.state_dir, "user_turns.jsonl", {"n": -1})
+        self.assertEqual(session_state.EventCache(self.state_dir).last(
+            "user_turns.jsonl")["n"], -1)
+        self.assertIsNone(session_state.read_last_event(
+            self.state_dir, "missing.jsonl"))
+
+    def test_last_falls_back_for_a_line_longer_than_the_block(self):
+        session_state.append_event(self.state_dir, "research.jsonl",
+                                   {"n": 1, "pad": "x" * 20000})
+        self.assertEqual(session_state.read_last_event(
+            self.state_dir, "research.jsonl")["n"], 1)
+
+    def test_stop_path_parses_each_file_once(self):
+        import candidate
+        import scoring
+        import session_report
+
+        for name in ("errors.jsonl", "changes.jsonl", "resolutions.jsonl"):
+            session_state.append_event(self.state_dir, name, {"n": 1})
+        reads = Counter()
+        real = session_state.read_events
+
+        def counting(state_dir, filename):
+            reads[filename] += 1
+            return real(state_dir, filename)
+
+        events = session_state.EventCache(self.state_dir)
+        with mock.patch.object(session_state, "read_events", counting):
+            session_report._persist_session({}, self.state_dir, events)
+            score, pattern, evidence = scoring.compute_importance(
+                self.state_dir, None, events)
+            candidate._build_candidate(score, pattern, evidence,
+                                       self.state_dir, events=events)
+        self.assertTrue(reads)
+        self.assertEqual(set(reads.values()), {1})
+
+
+class CounterTests(HookTestCase):
+    def test_increments_append_and_count(self):
+        for n in (1, 2, 3):
+            self.assertEqual(session_state.increment_counter(
+                self.state_dir, "user_turn_count"), n)
+        self.assertEqual(
+            (self.state_dir / "user_turn_count").read_bytes(), b"...")
+
+    def test_integer_file_still_reads_and_increments(self):
+        (self.state_dir / "user_turn_count").write_text("7", encoding="utf-8")
+        self.assertEqual(session_state.read_counter(
+            self.state_dir, "user_turn_count"), 7)
+        self.assertEqual(session_state.increment_counter(
+            self.state_dir, "user_turn_count"), 8)
+
+    def test_missing_or_garbled_counter_is_zero(self):
+        self.assertEqual(session_state.read_counter(self.state_dir, "nope"), 0)
+        (self.state_dir / "bad").write_text("x.", encoding="utf-8")
+        self.assertEqual(session_state.read_counter(self.state_dir, "bad"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
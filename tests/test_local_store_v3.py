@@ -176,5 +176,66 @@ class TestPruning(HookTestCase):
             "savings_events must not be pruned — ledger rows must survive")
 
 
+class CachedConnectionTest(HookTestCase):
+    def test_get_conn_reuses_connection(self):
+        self.assertIs(local_store.get_conn(), local_store.get_conn())
+
+    def test_get_conn_reopens_when_db_path_changes(self):
+        first = local_store.get_conn()
+        local_store.DB_PATH = self.tmp_path / "other.db"  # restored by patcher
+        second = local_store.get_conn()
+        self.assertIsNot(first, second)
+        self.assertTrue((self.tmp_path / "other.db").exists())
+        self.assertEqual(second.execute(
+            "SELECT COUNT(*) FROM projects").fetchone()[0], 0)
+
+    def test_schema_recreated_after_db_file_removed(self):
+        conn = local_store._get_conn()
+        conn.close()
+        local_store.DB_PATH.unlink()
+        conn = self.get_conn()
+        local_store.ensure_project(conn, "/p")
+
+    def test_missing_schema_object_recreated_on_cold_open(self):
+        conn = local_store._get_conn()
+        conn.execute("DROP INDEX idx_error_sig_resolved")
+        conn.commit()
+        conn.close()
+        # A fresh process has not set this path up yet.
+        local_store._SCHEMA_APPLIED.discard(str(local_store.DB_PATH))
+        conn = self.get_conn()
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_error_sig_resolved'"
+        ).fetchone()
+        self.assertIsNotNone(row)
+
+
+class BatchTest(HookTestCase):
+    def test_batch_commits_once_at_exit(self):
+        conn = self.get_conn()
+        with local_store.batch(conn):
+            pid = local_store.ensure_project(conn, "/p")
+            local_store.start_session(conn, "s1", pid)
+            self.assertTrue(conn.in_transaction)
+        self.assertFalse(conn.in_transaction)
+        other = sqlite3.connect(str(local_store.DB_PATH))
+        self.addCleanup(other.close)
+        self.assertEqual(other.execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0], 1)
+
+    def test_batch_rolls_back_on_error(self):
+        conn = self.get_conn()
+        with self.assertRaises(RuntimeError):
+            with local_store.batch(conn):
+                local_store.ensure_project(conn, "/p")
+                raise RuntimeError("boom")
+        self.assertIsNone(local_store.get_project_context(conn, "/p"))
+
+    def test_writes_outside_batch_still_autocommit(self):
+        conn = self.get_conn()
+        local_store.ensure_project(conn, "/p")
+        self.assertFalse(conn.in_transaction)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 """Zero-decision onboarding: auto-provisioning, MCP wiring, first-run notices."""
 
+import datetime
 import io
 import json
 import os
@@ -35,6 +36,8 @@ class OnboardingTestCase(HookTestCase):
             (session_start, "CONFIG_FILE", self.tmp_path / "config.json"),
             (session_start, "PENDING_DIR", self.tmp_path / "pending"),
             (session_start, "PING_MARKER", self.tmp_path / "last_ping_date"),
+            (session_start, "UPDATE_MARKER",
+             self.tmp_path / "last_update_check"),
             (session_state, "STATE_ROOT", self.tmp_path / "state"),
             (session_state, "HOOK_ERROR_LOG",
              self.tmp_path / "hook-errors.log"),
@@ -42,6 +45,10 @@ class OnboardingTestCase(HookTestCase):
             patcher = mock.patch.object(target, attr, value)
             patcher.start()
             self.addCleanup(patcher.stop)
+        # Today's update check already "ran": main() must not reach GitHub.
+        session_start.UPDATE_MARKER.write_text(
+            datetime.datetime.now(datetime.timezone.utc).date().isoformat(),
+            encoding="utf-8")
 
 
 class TestSaveConfig(OnboardingTestCase):
@@ -71,7 +78,7 @@ class TestConfigureMcp(OnboardingTestCase):
             captured["argv"] = argv
             return subprocess.CompletedProcess(argv, 0, stdout="", stderr="")
 
-        with mock.patch.object(session_start.subprocess, "run", fake_run):
+        with mock.patch.object(subprocess, "run", fake_run):
             ok = session_start.configure_mcp("ct_raw_key_123")
 
         self.assertTrue(ok)
@@ -81,7 +88,7 @@ class TestConfigureMcp(OnboardingTestCase):
 
     def test_missing_claude_cli_returns_false(self):
         with mock.patch.object(
-                session_start.subprocess, "run",
+                subprocess, "run",
                 side_effect=FileNotFoundError("claude not found")):
             self.assertFalse(session_start.configure_mcp("k"))
 
@@ -99,7 +106,7 @@ class TestConfigureMcp(OnboardingTestCase):
         with mock.patch.object(session_start.shutil, "which",
                                return_value=resolved), \
              mock.patch.object(session_start, "CLAUDE_BIN", resolved), \
-             mock.patch.object(session_start.subprocess, "run", fake_run):
+             mock.patch.object(subprocess, "run", fake_run):
             ok = session_start.configure_mcp("k")
 
         self.assertTrue(ok)
@@ -111,7 +118,7 @@ class TestConfigureMcp(OnboardingTestCase):
 
     def test_configure_mcp_logs_swallowed_exception(self):
         with mock.patch.object(
-                session_start.subprocess, "run",
+                subprocess, "run",
                 side_effect=FileNotFoundError("claude not found")):
             self.assertFalse(session_start.configure_mcp("k"))
         log = session_state.HOOK_ERROR_LOG
@@ -127,7 +134,7 @@ class TestConfigureMcp(OnboardingTestCase):
             calls.append(argv)
             return subprocess.CompletedProcess(argv, 0, stdout="", stderr="")
 
-        with mock.patch.object(session_start.subprocess, "run", fake_run):
+        with mock.patch.object(subprocess, "run", fake_run):
             ok = session_start.configure_mcp("idempotent_key")
 
         self.assertTrue(ok)
@@ -147,7 +154,7 @@ class TestConfigureMcp(OnboardingTestCase):
                 raise FileNotFoundError("claude not found")
             return add_result
 
-        with mock.patch.object(session_start.subprocess, "run", fake_run):
+        with mock.patch.object(subprocess, "run", fake_run):
             ok = session_start.configure_mcp("key_after_remove_fail")
 
         self.assertTrue(ok)
@@ -340,6 +347,122 @@ class TestFirstRunNotice(OnboardingTestCase):
         self.assertTrue(saved["pending_first_run_notice"])
 
 
+class TestDetectionCache(OnboardingTestCase):
+    """A warm start in the same repo skips the tree walk and the search."""
+
+    HIT = {"id": "t1", "title": "Known fix", "context_text": "c",
+           "solution_text": "s", "tags": []}
+
+    def _run_main(self, cwd, results):
+        stdin_data = json.dumps({"cwd": str(cwd), "session_id": "s-cache"})
+        with mock.patch.object(session_start, "maybe_ping"), \
+             mock.patch.object(session_start, "search_commontrace",
+                               return_value=results) as search, \
+             mock.patch.object(session_start, "detect_context",
+                               wraps=session_start.detect_context) as detect, \
+             mock.patch.object(sys, "stdin", io.StringIO(stdin_data)), \
+             redirect_stdout(io.StringIO()):
+            session_start.main()
+        return search.call_count, detect.call_count
+
+    def setUp(self):
+        super().setUp()
+        session_start.save_config({"api_key": "k"})
+        self.proj = self.tmp_path / "proj"
+        (self.proj / ".git").mkdir(parents=True)
+        (self.proj / "app.py").write_text("x = 1\n", encoding="utf-8")
+
+    def test_second_start_reuses_detection_and_results(self):
+        self.assertEqual(self._run_main(self.proj, [self.HIT]), (1, 1))
+        self.assertEqual(self._run_main(self.proj, [self.HIT]), (0, 0))
+
+    def test_empty_results_are_searched_again(self):
+        self._run_main(self.proj, [])
+        self.assertEqual(self._run_main(self.proj, []), (1, 0))
+
+    def test_manifest_change_invalidates(self):
+        self._run_main(self.proj, [self.HIT])
+        (self.proj / "pyproject.toml").write_text(
+            "[project]\ndependencies = ['fastapi']\n", encoding="utf-8")
+        self.assertEqual(self._run_main(self.proj, [self.HIT]), (1, 1))
+
+
+class TestFrameworkDetection(OnboardingTestCase):
+    """Frameworks come from declared dependencies, in priority order."""
+
+    def _query(self, manifest, text, source="app.py"):
+        proj = self.tmp_path / "proj"
+        (proj / ".git").mkdir(parents=True)
+        (proj / source).write_text("x = 1\n", encoding="utf-8")
+        (proj / manifest).write_text(text, encoding="utf-8")
+        return session_start.detect_context(str(proj))[0]
+
+    def test_pyproject_priority(self):
+        self.assertEqual(
+            self._query("pyproject.toml",
+                        "[project]\ndependencies = ['Flask>=2', 'FastAPI']\n"),
+            "python fastapi common patterns and solutions")
+
+    def test_poetry_dependencies(self):
+        self.assertEqual(
+            self._query("pyproject.toml",
+                        "[tool.poetry.dependencies]\nDjango = '^5'\n"),
+            "python django common patterns and solutions")
+
+    def test_mention_outside_dependencies_does_not_count(self):
+        self.assertEqual(
+            self._query("pyproject.toml",
+                        "[project]\ndescription = 'not a flask app'\n"
+                        "dependencies = ['requests']\n"),
+            "python common patterns and solutions")
+
+    def test_unparseable_manifest_falls_back_to_keywords(self):
+        self.assertEqual(
+            self._query("pyproject.toml", "[project\nflask\n"),
+            "python flask common patterns and solutions")
+
+    def test_package_json_priority(self):
+        self.assertEqual(
+            self._query("package.json",
+                        '{"dependencies": {"react": "1", "next": "1"}}',
+                        source="app.ts"),
+            "typescript next common patterns and solutions")
+
+
+class TestBackgroundChecks(OnboardingTestCase):
+    """Ping and update check run beside detection; their effects still land."""
+
+    def _run_main(self, cwd):
+        session_start.save_config({"api_key": "k"})
+        stdin_data = json.dumps({"cwd": str(cwd), "session_id": "s-bg"})
+        out = io.StringIO()
+        with mock.patch.object(session_start, "maybe_ping") as ping, \
+             mock.patch.object(session_start, "maybe_check_update",
+                               return_value="CommonTrace 9.9.9 is available"), \
+             mock.patch.object(session_start, "search_commontrace",
+                               return_value=[]), \
+             mock.patch.object(sys, "stdin", io.StringIO(stdin_data)), \
+             redirect_stdout(out):
+            session_start.main()
+        return out.getvalue(), ping
+
+    def test_update_note_is_appended(self):
+        proj = self.tmp_path / "proj"
+        (proj / ".git").mkdir(parents=True)
+        (proj / "app.py").write_text("x = 1\n", encoding="utf-8")
+        output, ping = self._run_main(proj)
+        ctx = json.loads(output)["hookSpecificOutput"]["additionalContext"]
+        self.assertTrue(ctx.endswith("CommonTrace 9.9.9 is available"))
+        ping.assert_called_once_with("k")
+
+    def test_ping_still_sent_when_detection_bails(self):
+        bare = self.tmp_path / "bare"
+        bare.mkdir()
+        output, ping = self._run_main(bare)
+        self.assertEqual(output, "")
+        ping.assert_called_once_with("k")
+
+
 class TestSilentSuccessSweep(OnboardingTestCase):
     """Status-bearing swallows log to hook-errors.log instead of vanishing.
 
@@ -356,14 +479,14 @@ class TestSilentSuccessSweep(OnboardingTestCase):
 
     def test_provision_api_key_logs_network_failure(self):
         with mock.patch.object(
-                session_start.urllib.request, "urlopen",
+                urllib.request, "urlopen",
                 side_effect=urllib.error.URLError("offline")):
             self.assertIsNone(session_start.provision_api_key())
         self.assertIn("[provision_api_key]", self._log_text())
 
     def test_post_json_telemetry_logs_failure_with_path(self):
         with mock.patch.object(
-                session_start.urllib.request, "urlopen",
+                urllib.request, "urlopen",
                 side_effect=OSError("boom")):
             ok = session_start._post_json(
                 "/api/v1/telemetry/ping", {}, "k", timeout=1.0)
@@ -372,7 +495,7 @@ class TestSilentSuccessSweep(OnboardingTestCase):
 
     def test_session_start_search_logs_network_failure(self):
         with mock.patch.object(
-                session_start.urllib.request, "urlopen",
+                urllib.request, "urlopen",
                 side_effect=urllib.error.URLError("offline")):
             results = session_start.search_commontrace("q", "python", "k")
         self.assertEqual(results, [])
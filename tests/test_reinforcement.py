@@ -64,7 +64,7 @@ class ReinforcementUnitTest(unittest.TestCase):
 
 
 from base import HookTestCase
-from session_state import append_event
+from session_state import EventCache, append_event
 
 
 class ReinforcementIntegrationTest(HookTestCase):
@@ -90,6 +90,16 @@ class ReinforcementIntegrationTest(HookTestCase):
         # the delta because reinforcement only touches mapped patterns.
         self.assertAlmostEqual(boosted - base, 0.9, places=5)
 
+    def test_precheck_rejects_only_unreachable_sessions(self):
+        sd = self._seed_error_resolution()
+        eff = {"error_recurrence": {"fired": 5, "consumed": 5, "rate": 1.0}}
+        best, _, _ = scoring.compute_importance(sd, eff)
+        self.assertLess(best, scoring.IMPORTANCE_THRESHOLD)
+        self.assertFalse(scoring.can_reach_threshold(EventCache(sd)))
+        append_event(sd, "candidates.jsonl",
+                     {"t": 180, "pattern": "test_fix_cycle"})
+        self.assertTrue(scoring.can_reach_threshold(EventCache(sd)))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,105 @@
+"""retrieval.search_commontrace reuses an identical search for ten minutes.
+
+A debugging loop re-triggers the same error, and each retrigger used to
+pay a full HTTPS round-trip for the hits it had just been shown. Only an
+answered search is stored: a network failure must be retried, not cached
+as "no matches" — though an unreachable backend is left alone for a
+minute, so a run of failing tool calls doesn't each wait out the timeout.
+"""
+
+import os
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from tests.base import HookTestCase, ct_config, retrieval, session_state
+
+
+class FakeResp:
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def read(self):
+        return self.body
+
+
+def _answer(body=b'{"results": [{"id": "t1"}]}'):
+    return mock.patch.object(urllib.request, "urlopen",
+                             return_value=FakeResp(body))
+
+
+class TestSearchCache(HookTestCase):
+    def test_repeat_search_is_served_from_disk(self):
+        with _answer() as urlopen:
+            first = retrieval.search_commontrace("boom", "k")
+            second = retrieval.search_commontrace("boom", "k")
+        self.assertEqual(first, [{"id": "t1"}])
+        self.assertEqual(second, first)
+        self.assertEqual(urlopen.call_count, 1)
+
+    def test_different_context_is_a_different_entry(self):
+        with _answer() as urlopen:
+            retrieval.search_commontrace("boom", "k", {"language": "go"})
+            retrieval.search_commontrace("boom", "k", {"language": "rust"})
+        self.assertEqual(urlopen.call_count, 2)
+
+    def test_stale_entry_is_refetched(self):
+        with _answer() as urlopen:
+            retrieval.search_commontrace("boom", "k")
+            (entry,) = ct_config.SEARCH_CACHE_DIR.glob("*.json")
+            old = time.time() - retrieval._SEARCH_CACHE_TTL - 1
+            os.utime(entry, (old, old))
+            retrieval.search_commontrace("boom", "k")
+        self.assertEqual(urlopen.call_count, 2)
+
+    def test_failed_search_is_not_cached(self):
+        with mock.patch.object(urllib.request, "urlopen",
+                               side_effect=urllib.error.URLError("offline")):
+            self.assertEqual(retrieval.search_commontrace("boom", "k"), [])
+        (ct_config.COOLDOWN_DIR / "backend_down.ts").unlink()
+        with _answer() as urlopen:
+            self.assertEqual(retrieval.search_commontrace("boom", "k"),
+                             [{"id": "t1"}])
+        self.assertEqual(urlopen.call_count, 1)
+
+    def test_cache_is_bounded(self):
+        with _answer(), mock.patch.object(retrieval, "_SEARCH_CACHE_MAX", 2):
+            for q in ("a", "b", "c"):
+                retrieval.search_commontrace(q, "k")
+        self.assertEqual(len(list(ct_config.SEARCH_CACHE_DIR.glob("*.json"))), 2)
+
+
+class TestBackendDown(HookTestCase):
+    def _fail(self, error):
+        with mock.patch.object(urllib.request, "urlopen",
+                               side_effect=error) as urlopen:
+            retrieval.search_commontrace("a", "k")
+            retrieval.search_commontrace("b", "k")
+        return urlopen.call_count
+
+    def test_unreachable_backend_skips_the_next_searches(self):
+        self.assertEqual(self._fail(urllib.error.URLError("offline")), 1)
+
+    def test_timeout_skips_the_next_searches(self):
+        self.assertEqual(self._fail(TimeoutError("timed out")), 1)
+
+    def test_failures_log_to_the_isolated_error_log(self):
+        self._fail(urllib.error.URLError("offline"))
+        self.assertIn("[search_commontrace]",
+                      session_state.HOOK_ERROR_LOG.read_text(encoding="utf-8"))
+
+    def test_client_error_does_not_trip_the_breaker(self):
+        err = urllib.error.HTTPError("u", 422, "bad", {}, None)
+        self.assertEqual(self._fail(err), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
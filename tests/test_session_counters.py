@@ -7,6 +7,10 @@ Formatter tests pin contributor provenance display (spec §4.2) with
 sanitization — display names are user-supplied (injection surface).
 """
 
+import http.server
+import json
+import os
+import threading
 import time
 import unittest
 
@@ -113,5 +117,42 @@ class TestProvenanceFormatting(unittest.TestCase):
             {"title": "T", "id": "tid-4"}))
 
 
+class TestDetachedTelemetryPost(HookTestCase):
+    """The Stop hook hands the POST to a child; the child still delivers it."""
+
+    def test_child_posts_body_with_key(self):
+        # The child inherits this environment: a failed POST must log under
+        # the temp home, not the developer's real ~/.commontrace.
+        os.environ["HOME"] = os.environ["USERPROFILE"] = str(self.tmp_path)
+        received = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append((self.path, self.headers["X-API-Key"],
+                                 json.loads(self.rfile.read(length))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *a):
+                pass
+
+        server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.handle_request, daemon=True)
+        thread.start()
+
+        started = time.monotonic()
+        proc = session_report._post_detached(
+            f"http://127.0.0.1:{server.server_port}/api/v1/telemetry/triggers",
+            {"session_id": "s1", "searches_fired": 2}, "k")
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        thread.join(10)
+        self.assertEqual(proc.wait(10), 0)
+        self.assertEqual(received, [("/api/v1/telemetry/triggers", "k",
+                                     {"session_id": "s1", "searches_fired": 2})])
+
+
 if __name__ == "__main__":
     unittest.main()